@@ -1,13 +1,21 @@
 from flask import Flask
 from flask_cors import CORS
 from flask_migrate import Migrate
+from flask_compress import Compress
 from app.models import db
+from app.utils.engine import configure_engine_options, init_engine
+from app.utils.cache import response_cache
+from app.utils.events import job_events
+from app.utils.profiling import query_profiler
+from app.utils.ratelimit import init_limiter, limiter
+from app.utils.migrations import upgrade_schema
 from config import config
 import os
 import logging
 import atexit
 
 migrate = Migrate()
+compress = Compress()
 
 # Configuration du logging
 logging.basicConfig(
@@ -25,8 +33,16 @@ def create_app(config_name=None):
     app.config.from_object(config[config_name])
     
     # Initialiser les extensions
+    configure_engine_options(app)
     db.init_app(app)
+    init_engine(app)
     migrate.init_app(app, db)
+    response_cache.init_app(app)
+    job_events.init_app(app)
+    query_profiler.init_app(app)
+    init_limiter(app)
+    if app.config.get('RESPONSE_COMPRESSION_ENABLED', True):
+        compress.init_app(app)
     CORS(app, 
          origins=["http://localhost:5173"],
          methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
@@ -76,6 +92,7 @@ def create_app(config_name=None):
     
     # Route de santé
     @app.route('/health')
+    @limiter.exempt
     def health_check():
         scraping_status = None
         if scraping_service:
@@ -94,6 +111,7 @@ def create_app(config_name=None):
     with app.app_context():
         try:
             db.create_all()
+            upgrade_schema()
             print("✅ Database tables created successfully")
             
             # Démarrer le scraping service après l'initialisation
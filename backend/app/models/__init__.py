@@ -1,8 +1,20 @@
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
 from datetime import datetime
 import json
 
-db = SQLAlchemy()
+
+class RoutingSession(Session):
+    """Session qui peut être routée vers un bind nommé via session.info['bind_key']"""
+    
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        bind_key = self.info.get('bind_key')
+        if bind is None and bind_key is not None and bind_key in self._db.engines:
+            return self._db.engines[bind_key]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 class Search(db.Model):
     """Modèle pour les recherches d'emploi configurées par l'utilisateur"""
@@ -17,9 +29,15 @@ class Search(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
-    # Relation vers les jobs trouvés
-    jobs = db.relationship('Job', backref='search', lazy=True, cascade='all, delete-orphan')
-    execution_logs = db.relationship('ExecutionLog', backref='search', lazy=True, cascade='all, delete-orphan')
+    # Filigrane "vu jusqu'à" : les offres d'id inférieur ou égal sont vues (voir Job.is_new)
+    seen_until_id = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    
+    # Relations en mode requête : jamais chargées entièrement de façon implicite.
+    # La suppression en cascade est faite par la base (ON DELETE CASCADE), sans charger les lignes filles.
+    jobs = db.relationship('Job', backref='search', lazy='dynamic',
+                           cascade='all, delete-orphan', passive_deletes=True)
+    execution_logs = db.relationship('ExecutionLog', backref='search', lazy='dynamic',
+                                     cascade='all, delete-orphan', passive_deletes=True)
     
     def __init__(self, keywords, job_types, platforms, duration_minutes=15):
         self.keywords = keywords
@@ -43,8 +61,22 @@ class Search(db.Model):
         except (json.JSONDecodeError, TypeError):
             return []
     
-    def to_dict(self):
-        """Convertit l'objet en dictionnaire"""
+    def job_counts(self):
+        """Retourne (total, nouvelles) offres depuis les compteurs matérialisés"""
+        total, new = db.session.query(
+            db.func.coalesce(db.func.sum(JobCounter.total_jobs), 0),
+            db.func.coalesce(db.func.sum(JobCounter.new_jobs), 0)
+        ).filter(JobCounter.search_id == self.id).one()
+        return total, new
+    
+    def to_dict(self, job_counts=None):
+        """
+        Convertit l'objet en dictionnaire
+        
+        Args:
+            job_counts: (total, nouvelles) précalculés, pour sérialiser une liste sans requête par recherche
+        """
+        total_jobs, new_jobs = job_counts if job_counts is not None else self.job_counts()
         return {
             'id': self.id,
             'keywords': self.keywords,
@@ -54,7 +86,8 @@ class Search(db.Model):
             'is_active': self.is_active,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
-            'total_jobs': len(self.jobs)
+            'total_jobs': total_jobs,
+            'new_jobs': new_jobs
         }
     
     def __repr__(self):
@@ -64,9 +97,20 @@ class Search(db.Model):
 class Job(db.Model):
     """Modèle pour les offres d'emploi trouvées"""
     __tablename__ = 'jobs'
+    __table_args__ = (
+        # Pagination keyset : ORDER BY date_found DESC, id DESC
+        db.Index('ix_jobs_date_found_id', 'date_found', 'id'),
+        # Offres d'une recherche (get_jobs_for_search, pagination par recherche)
+        db.Index('ix_jobs_search_date_found', 'search_id', 'date_found', 'id'),
+        # Offres d'une plateforme triées par date
+        db.Index('ix_jobs_platform_date_found', 'platform', 'date_found', 'id'),
+        # Tendances par jour et compteurs horaires (parcours d'intervalle sur l'index)
+        db.Index('ix_jobs_day_found_platform', 'day_found', 'platform'),
+        db.Index('ix_jobs_hour_found_platform', 'hour_found', 'platform'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
-    search_id = db.Column(db.Integer, db.ForeignKey('searches.id'), nullable=False, index=True)
+    search_id = db.Column(db.Integer, db.ForeignKey('searches.id', ondelete='CASCADE'), nullable=False, index=True)
     title = db.Column(db.String(300), nullable=False, index=True)
     company = db.Column(db.String(200), index=True)
     url = db.Column(db.Text, nullable=False, unique=True)
@@ -77,7 +121,13 @@ class Job(db.Model):
     job_type = db.Column(db.String(100))  # CDI, CDD, Alternance, Stage, etc.
     date_posted = db.Column(db.DateTime, index=True)  # Date de publication sur la plateforme
     date_found = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
-    is_new = db.Column(db.Boolean, default=True, nullable=False, index=True)
+    # Jour et heure de date_found, calculés à l'insertion pour grouper sans expression SQL
+    day_found = db.Column(db.Date)
+    hour_found = db.Column(db.DateTime)
+    
+    # Ancienne colonne is_new, conservée pour les bases existantes mais plus mise à jour :
+    # l'état "nouvelle" est dérivé du filigrane de la recherche (voir Job.is_new plus bas)
+    is_new_at_insert = db.Column('is_new', db.Boolean, default=True, nullable=False)
     
     def to_dict(self):
         """Convertit l'objet en dictionnaire"""
@@ -101,12 +151,25 @@ class Job(db.Model):
         return f'<Job {self.id}: {self.title} at {self.company}>'
 
 
+@db.event.listens_for(Job, 'before_insert')
+def _set_job_buckets(mapper, connection, job):
+    """Renseigne les colonnes day_found/hour_found à partir de date_found"""
+    if job.date_found is None:
+        job.date_found = datetime.utcnow()
+    job.day_found = job.date_found.date()
+    job.hour_found = job.date_found.replace(minute=0, second=0, microsecond=0)
+
+
 class ExecutionLog(db.Model):
     """Modèle pour les logs d'exécution des scrapers"""
     __tablename__ = 'execution_logs'
+    __table_args__ = (
+        # Logs d'une recherche, paginés par (executed_at, id)
+        db.Index('ix_execution_logs_search_executed_id', 'search_id', 'executed_at', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
-    search_id = db.Column(db.Integer, db.ForeignKey('searches.id'), nullable=False, index=True)
+    search_id = db.Column(db.Integer, db.ForeignKey('searches.id', ondelete='CASCADE'), nullable=False, index=True)
     platform = db.Column(db.String(50), nullable=False, index=True)
     jobs_found = db.Column(db.Integer, default=0, nullable=False)
     new_jobs_found = db.Column(db.Integer, default=0, nullable=False)
@@ -133,20 +196,117 @@ class ExecutionLog(db.Model):
         return f'<ExecutionLog {self.id}: {self.platform} - {self.status}>'
 
 
+class JobSeenOverride(db.Model):
+    """État "nouvelle"/"vue" forcé sur une offre, quand il diffère de celui donné par le filigrane"""
+    __tablename__ = 'job_seen_overrides'
+    
+    job_id = db.Column(db.Integer, db.ForeignKey('jobs.id', ondelete='CASCADE'), primary_key=True)
+    search_id = db.Column(db.Integer, db.ForeignKey('searches.id', ondelete='CASCADE'), nullable=False, index=True)
+    is_new = db.Column(db.Boolean, nullable=False)
+    
+    def __repr__(self):
+        return f'<JobSeenOverride {self.job_id}: {"new" if self.is_new else "seen"}>'
+
+
+# Une offre est nouvelle si son id dépasse le filigrane de sa recherche, sauf état forcé :
+# marquer une recherche comme vue ne modifie plus qu'une ligne.
+# Pour les listes, JOB_IS_NEW se lit sur une requête jointe par join_new_state() (jointure sur
+# la clé primaire de searches et de job_seen_overrides, sans sous-requête par ligne)
+JOB_IS_NEW = db.func.coalesce(
+    JobSeenOverride.is_new,
+    Job.id > db.func.coalesce(Search.seen_until_id, 0),
+    type_=db.Boolean
+)
+
+
+def join_new_state(query):
+    """Joint à une requête Job sa recherche et son état forcé, pour filtrer ou lire JOB_IS_NEW"""
+    return query.join(Search, Search.id == Job.search_id)\
+                .outerjoin(JobSeenOverride, JobSeenOverride.job_id == Job.id)
+
+
+# Même état pour une offre isolée (Job.to_dict), chargé à la demande seulement
+Job.is_new = db.column_property(
+    db.func.coalesce(
+        db.select(JobSeenOverride.is_new)
+          .where(JobSeenOverride.job_id == Job.id)
+          .correlate_except(JobSeenOverride)
+          .scalar_subquery(),
+        Job.id > db.func.coalesce(
+            db.select(Search.seen_until_id)
+              .where(Search.id == Job.search_id)
+              .correlate_except(Search)
+              .scalar_subquery(),
+            0
+        ),
+        type_=db.Boolean
+    ),
+    deferred=True
+)
+
+
+class JobChange(db.Model):
+    """
+    Journal append-only des changements d'offres : son id sert de jeton de synchronisation
+    incrémentale (GET /api/jobs/changes?since=<jeton>)
+    """
+    __tablename__ = 'job_changes'
+    __table_args__ = (
+        # Changements d'une recherche après un jeton
+        db.Index('ix_job_changes_search_id_id', 'search_id', 'id'),
+        # Jetons jamais réutilisés, même après la purge des dernières lignes par la rétention
+        {'sqlite_autoincrement': True},
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(20), nullable=False)  # 'insert', 'new', 'seen', 'search_seen'
+    job_id = db.Column(db.Integer)  # Sans clé étrangère : le journal survit aux suppressions
+    search_id = db.Column(db.Integer, nullable=False)
+    is_new = db.Column(db.Boolean)
+    seen_until_id = db.Column(db.Integer)  # Filigrane, pour 'search_seen'
+    changed_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+    
+    def to_dict(self):
+        """Convertit l'objet en dictionnaire"""
+        return {
+            'token': self.id,
+            'kind': self.kind,
+            'job_id': self.job_id,
+            'search_id': self.search_id,
+            'is_new': self.is_new,
+            'seen_until_id': self.seen_until_id,
+            'changed_at': self.changed_at.isoformat() if self.changed_at else None
+        }
+    
+    def __repr__(self):
+        return f'<JobChange {self.id}: {self.kind} {self.job_id or self.search_id}>'
+
+
 class JobMetrics(db.Model):
-    """Modèle pour stocker des métriques agrégées (optionnel, pour optimisation)"""
+    """
+    Métriques d'exécution agrégées par jour et par plateforme, maintenues à chaque exécution
+    (statistiques de /api/scraping/stats ; les tendances d'offres utilisent Job.day_found)
+    """
     __tablename__ = 'job_metrics'
+    __table_args__ = (
+        db.Index('ux_job_metrics_date_platform', 'date', 'platform', unique=True),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     date = db.Column(db.Date, nullable=False, index=True)
     platform = db.Column(db.String(50), nullable=False, index=True)
     total_jobs_scraped = db.Column(db.Integer, default=0)
     total_new_jobs = db.Column(db.Integer, default=0)
-    total_searches = db.Column(db.Integer, default=0)
+    total_searches = db.Column(db.Integer, default=0)  # Plus maintenu (aucun lecteur)
     avg_execution_time = db.Column(db.Float)
     success_rate = db.Column(db.Float)  # Pourcentage de succès
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    # Compteurs bruts permettant la mise à jour incrémentale des moyennes
+    total_executions = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    successful_executions = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    total_execution_time = db.Column(db.Float, default=0, server_default='0', nullable=False)
+    
     def to_dict(self):
         """Convertit l'objet en dictionnaire"""
         return {
@@ -158,8 +318,44 @@ class JobMetrics(db.Model):
             'total_searches': self.total_searches,
             'avg_execution_time': self.avg_execution_time,
             'success_rate': self.success_rate,
+            'total_executions': self.total_executions,
+            'successful_executions': self.successful_executions,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
     
     def __repr__(self):
         return f'<JobMetrics {self.date} - {self.platform}>'
+
+
+class JobCounter(db.Model):
+    """Compteurs matérialisés d'offres par recherche et par plateforme"""
+    __tablename__ = 'job_counters'
+    
+    search_id = db.Column(db.Integer, db.ForeignKey('searches.id', ondelete='CASCADE'), primary_key=True)
+    platform = db.Column(db.String(50), primary_key=True)
+    total_jobs = db.Column(db.Integer, default=0, nullable=False)
+    new_jobs = db.Column(db.Integer, default=0, nullable=False)
+    
+    def to_dict(self):
+        """Convertit l'objet en dictionnaire"""
+        return {
+            'search_id': self.search_id,
+            'platform': self.platform,
+            'total_jobs': self.total_jobs,
+            'new_jobs': self.new_jobs
+        }
+    
+    def __repr__(self):
+        return f'<JobCounter {self.search_id}/{self.platform}: {self.total_jobs}>'
+
+
+class JobHourlyCount(db.Model):
+    """Nombre d'offres trouvées par heure et par plateforme (fenêtre glissante des 24h)"""
+    __tablename__ = 'job_hourly_counts'
+    
+    hour = db.Column(db.DateTime, primary_key=True)
+    platform = db.Column(db.String(50), primary_key=True)
+    jobs_found = db.Column(db.Integer, default=0, nullable=False)
+    
+    def __repr__(self):
+        return f'<JobHourlyCount {self.hour} - {self.platform}: {self.jobs_found}>'
@@ -1,10 +1,20 @@
-from flask import Blueprint, request, jsonify
-from app.models import db, Job
+from datetime import datetime
+from flask import Blueprint, Response, request, jsonify, current_app
+from app.models import db, Job, join_new_state
 from app.utils.database import DatabaseUtils
+from app.utils.cache import cached_response, conditional_get, invalidate_responses
+from app.utils.pagination import paginate_keyset, paginate_ranked, InvalidCursor
+from app.utils.fulltext import apply_fulltext_search
+from app.utils.serialization import job_rows, rows_to_dicts, json_response
+from app.utils.export import EXPORT_FORMATS, export_stream, stream_chunks, parquet_available
+from app.utils.events import job_events, event_stream
+from app.utils.facets import facet_counts, parse_facets
+from app.utils.ratelimit import limiter, EXPENSIVE_SCOPE, expensive_limit, search_cost, export_cost
 
 jobs_bp = Blueprint('jobs', __name__)
 
 @jobs_bp.route('/jobs', methods=['GET'])
+@conditional_get
 def get_jobs():
     """Récupère les offres d'emploi avec filtres optionnels"""
     try:
@@ -14,43 +24,190 @@ def get_jobs():
         new_only = request.args.get('new_only', 'false').lower() == 'true'
         platform = request.args.get('platform')
         hours = request.args.get('hours', type=int)  # Jobs des dernières X heures
+        cursor = request.args.get('cursor')  # Curseur de la page suivante
         
-        # Limiter le nombre de résultats
-        if limit > 200:
-            limit = 200
+        # Limiter le nombre de résultats (1 à 200)
+        limit = max(1, min(limit, 200))
         
-        jobs = []
+        query = job_rows(DatabaseUtils.jobs_query(
+            search_id=search_id,
+            new_only=new_only,
+            platform=platform,
+            hours=hours
+        ))
+        jobs, next_cursor = paginate_keyset(query, Job.date_found, Job.id, cursor, limit)
         
-        if search_id:
-            # Jobs pour une recherche spécifique
-            jobs = DatabaseUtils.get_jobs_for_search(search_id, limit, new_only)
-        elif hours:
-            # Jobs récents
-            jobs = DatabaseUtils.get_recent_jobs(hours, limit)
-        else:
-            # Tous les jobs avec filtres optionnels
-            query = Job.query
-            
-            if new_only:
-                query = query.filter_by(is_new=True)
-            
-            if platform:
-                query = query.filter_by(platform=platform)
-            
-            jobs = query.order_by(Job.date_found.desc()).limit(limit).all()
-        
-        return jsonify({
-            'jobs': [job.to_dict() for job in jobs],
+        return json_response({
+            'jobs': rows_to_dicts(jobs),
             'total': len(jobs),
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None,
             'filters': {
                 'search_id': search_id,
                 'limit': limit,
                 'new_only': new_only,
                 'platform': platform,
-                'hours': hours
+                'hours': hours,
+                'cursor': cursor
             }
         }), 200
         
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': f'Internal server error: {str(e)}'}), 500
+
+@jobs_bp.route('/jobs/export', methods=['GET'])
+@limiter.shared_limit(expensive_limit, scope=EXPENSIVE_SCOPE, cost=export_cost)
+def export_jobs():
+    """
+    Exporte en flux toutes les offres correspondant aux filtres (format=ndjson|csv|parquet),
+    sans limite de nombre de lignes
+    """
+    try:
+        export_format = request.args.get('format', 'ndjson').lower()
+        search_id = request.args.get('search_id', type=int)
+        platform = request.args.get('platform')
+        new_only = request.args.get('new_only', 'false').lower() == 'true'
+        
+        if export_format not in EXPORT_FORMATS:
+            return jsonify({'error': f"Invalid format, expected one of: {', '.join(EXPORT_FORMATS)}"}), 400
+        if export_format == 'parquet' and not parquet_available():
+            return jsonify({'error': 'Parquet export requires pyarrow'}), 400
+        
+        # Période (dates ISO 8601, bornes optionnelles)
+        try:
+            since = datetime.fromisoformat(request.args['since']) if request.args.get('since') else None
+            until = datetime.fromisoformat(request.args['until']) if request.args.get('until') else None
+        except ValueError:
+            return jsonify({'error': 'Invalid date, expected ISO 8601 (since / until)'}), 400
+        
+        query = DatabaseUtils.jobs_query(search_id=search_id, new_only=new_only, platform=platform)
+        if since:
+            query = query.filter(Job.date_found >= since)
+        if until:
+            query = query.filter(Job.date_found < until)
+        
+        # Ordre servi par les index (…, date_found, id) : pas de tri à matérialiser
+        statement = job_rows(query).order_by(Job.date_found, Job.id).statement
+        chunks = stream_chunks(db.engine, statement, current_app.config.get('EXPORT_CHUNK_SIZE', 5000))
+        
+        filename = f"jobs-{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}.{export_format}"
+        return Response(
+            export_stream(export_format, chunks),
+            mimetype=EXPORT_FORMATS[export_format],
+            headers={'Content-Disposition': f'attachment; filename={filename}'}
+        )
+        
+    except Exception as e:
+        return jsonify({'error': f'Internal server error: {str(e)}'}), 500
+
+@jobs_bp.route('/jobs/stream', methods=['GET'])
+def stream_jobs():
+    """
+    Flux Server-Sent Events des nouvelles offres (filtres search_id et platform).
+    Reprise après déconnexion via l'en-tête Last-Event-ID (ou ?last_event_id=).
+    """
+    try:
+        search_id = request.args.get('search_id', type=int)
+        platform = request.args.get('platform')
+        last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+        
+        try:
+            last_id = int(last_event_id) if last_event_id else None
+        except ValueError:
+            return jsonify({'error': 'Invalid Last-Event-ID'}), 400
+        
+        replay = None
+        if last_id is None:
+            # Nouveau client : seulement les offres publiées à partir de maintenant
+            last_id = job_events.latest_id()
+        else:
+            # Offres antérieures au tampon (redémarrage, longue déconnexion) : relues en base par
+            # lots, sur une connexion dédiée (le générateur s'exécute hors du contexte de requête)
+            statement = job_rows(DatabaseUtils.jobs_query(search_id=search_id, platform=platform)).statement
+            engine = db.engine
+            
+            def replay(after_id, before_id, limit):
+                query = statement.where(Job.id > after_id)
+                if before_id is not None:
+                    query = query.where(Job.id < before_id)
+                with engine.connect() as conn:
+                    rows = conn.execute(query.order_by(Job.id).limit(limit)).all()
+                # Comme les événements publiés : l'offre telle qu'à son insertion
+                return [dict(job, is_new=True) for job in rows_to_dicts(rows)]
+        
+        def matches(job):
+            return (search_id is None or job['search_id'] == search_id) and \
+                   (platform is None or job['platform'] == platform)
+        
+        return Response(
+            event_stream(
+                job_events, last_id, matches, replay=replay,
+                replay_batch=current_app.config.get('JOB_STREAM_BUFFER_SIZE', 1000),
+                heartbeat=current_app.config.get('JOB_STREAM_HEARTBEAT_SECONDS', 15),
+                max_seconds=current_app.config.get('JOB_STREAM_MAX_SECONDS', 300)
+            ),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+        
+    except Exception as e:
+        return jsonify({'error': f'Internal server error: {str(e)}'}), 500
+
+@jobs_bp.route('/jobs/changes', methods=['GET'])
+def get_job_changes():
+    """
+    Synchronisation incrémentale : offres insérées et changements d'is_new depuis un jeton.
+    Sans ?since=, renvoie le jeton courant (point de départ du client).
+    """
+    try:
+        search_id = request.args.get('search_id', type=int)
+        limit = request.args.get('limit', default=500, type=int)
+        since = request.args.get('since')
+        
+        if limit < 1:
+            return jsonify({'error': 'limit must be at least 1'}), 400
+        limit = min(limit, 2000)
+        
+        oldest, latest = DatabaseUtils.get_change_token_bounds()
+        if since is None:
+            return jsonify({'changes': [], 'next_token': latest, 'has_more': False, 'reset': False}), 200
+        
+        try:
+            since = int(since)
+        except ValueError:
+            return jsonify({'error': 'Invalid change token'}), 400
+        
+        # Jeton antérieur au journal conservé (changements purgés), ou postérieur au dernier
+        # (base restaurée) : le client doit resynchroniser depuis GET /jobs
+        expired = since < oldest - 1 if oldest is not None else since < latest
+        if expired or since > latest:
+            return jsonify({'changes': [], 'next_token': latest, 'has_more': False, 'reset': True}), 200
+        
+        changes, next_token, has_more = DatabaseUtils.get_job_changes(since, limit, search_id)
+        
+        # Contenu des offres insérées, en une seule requête
+        inserted_ids = {change.job_id for change in changes if change.kind == 'insert'}
+        jobs = {}
+        if inserted_ids:
+            rows = rows_to_dicts(job_rows(join_new_state(Job.query)).filter(Job.id.in_(inserted_ids)).all())
+            jobs = {job['id']: job for job in rows}
+        
+        payload = []
+        for change in changes:
+            entry = change.to_dict()
+            if change.kind == 'insert':
+                entry['job'] = jobs.get(change.job_id)  # None si supprimée depuis
+            payload.append(entry)
+        
+        return json_response({
+            'changes': payload,
+            'next_token': next_token,
+            'has_more': has_more,
+            'reset': False
+        }), 200
+        
     except Exception as e:
         return jsonify({'error': f'Internal server error: {str(e)}'}), 500
 
@@ -81,13 +238,14 @@ def update_job(job_id):
         
         # Mettre à jour les champs modifiables
         if 'is_new' in data:
-            job.is_new = data['is_new']
+            DatabaseUtils.set_jobs_new_state([job.id], bool(data['is_new']))
         
         if 'status' in data:
             # Ajouter un champ status si nécessaire
             job.status = data['status']
         
         db.session.commit()
+        invalidate_responses()
         
         return jsonify({
             'message': 'Job updated successfully',
@@ -116,8 +274,7 @@ def mark_jobs_seen():
             
         elif job_ids:
             # Marquer des offres spécifiques comme vues
-            Job.query.filter(Job.id.in_(job_ids)).update({Job.is_new: False})
-            db.session.commit()
+            DatabaseUtils.set_jobs_new_state(job_ids, False)
             message = f'{len(job_ids)} jobs marked as seen'
             
         else:
@@ -130,6 +287,7 @@ def mark_jobs_seen():
         return jsonify({'error': f'Internal server error: {str(e)}'}), 500
 
 @jobs_bp.route('/jobs/stats', methods=['GET'])
+@cached_response()
 def get_jobs_stats():
     """Récupère des statistiques sur les offres d'emploi"""
     try:
@@ -154,24 +312,18 @@ def get_jobs_stats():
         return jsonify({'error': f'Internal server error: {str(e)}'}), 500
 
 @jobs_bp.route('/jobs/platforms', methods=['GET'])
+@cached_response()
 def get_platforms():
     """Récupère la liste des plateformes disponibles avec leurs statistiques"""
     try:
-        # Compter les jobs par plateforme
-        from sqlalchemy import func
-        platform_stats = db.session.query(
-            Job.platform,
-            func.count(Job.id).label('total_jobs'),
-            func.sum(func.cast(Job.is_new, db.Integer)).label('new_jobs')
-        ).group_by(Job.platform).all()
-        
+        # Compteurs matérialisés par plateforme
         platforms = [
             {
-                'name': stat[0],
-                'total_jobs': stat[1],
-                'new_jobs': stat[2] or 0
+                'name': stat['platform'],
+                'total_jobs': stat['total'],
+                'new_jobs': stat['new']
             }
-            for stat in platform_stats
+            for stat in DatabaseUtils.get_platform_counters()
         ]
         
         return jsonify({
@@ -183,33 +335,59 @@ def get_platforms():
         return jsonify({'error': f'Internal server error: {str(e)}'}), 500
 
 @jobs_bp.route('/jobs/search', methods=['POST'])
+@limiter.shared_limit(expensive_limit, scope=EXPENSIVE_SCOPE, cost=search_cost)
 def search_jobs():
     """Recherche dans les offres d'emploi existantes"""
     try:
         data = request.get_json()
         if not data:
             return jsonify({'error': 'No search criteria provided'}), 400
+        if not isinstance(data, dict):
+            return jsonify({'error': 'Search criteria must be a JSON object'}), 400
         
         query_text = data.get('query', '').strip()
         platforms = data.get('platforms', [])
         job_types = data.get('job_types', [])
         limit = data.get('limit', 50)
+        cursor = data.get('cursor')
+        sort = data.get('sort')  # 'relevance' ou 'date'
+        facet_limit = data.get('facet_limit', 10)
+        
+        if not isinstance(limit, int) or isinstance(limit, bool):
+            return jsonify({'error': 'limit must be an integer'}), 400
+        limit = max(1, min(limit, 200))
         
-        if limit > 200:
-            limit = 200
+        if not isinstance(facet_limit, int) or isinstance(facet_limit, bool):
+            return jsonify({'error': 'facet_limit must be an integer'}), 400
+        facet_limit = max(1, min(facet_limit, 50))
+        
+        try:
+            # true pour toutes les facettes, ou liste : platform, job_type, company, location
+            facets = parse_facets(data.get('facets'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
         # Construire la requête
         query = Job.query
+        rank = None
         
-        # Recherche textuelle dans le titre et la description
+        # Recherche textuelle dans le titre, l'entreprise et la description
         if query_text:
-            from sqlalchemy import or_
-            search_filter = or_(
-                Job.title.ilike(f'%{query_text}%'),
-                Job.description_snippet.ilike(f'%{query_text}%'),
-                Job.company.ilike(f'%{query_text}%')
-            )
-            query = query.filter(search_filter)
+            fulltext = apply_fulltext_search(query, query_text)
+            if fulltext:
+                query, rank = fulltext
+            else:
+                # Repli sans index plein texte
+                from sqlalchemy import or_
+                search_filter = or_(
+                    Job.title.ilike(f'%{query_text}%'),
+                    Job.description_snippet.ilike(f'%{query_text}%'),
+                    Job.company.ilike(f'%{query_text}%')
+                )
+                query = query.filter(search_filter)
+        
+        if sort is None:
+            sort = 'relevance' if rank is not None else 'date'
         
         # Filtrer par plateformes
         if platforms:
@@ -219,18 +397,39 @@ def search_jobs():
         if job_types:
             query = query.filter(Job.job_type.in_(job_types))
         
-        jobs = query.order_by(Job.date_found.desc()).limit(limit).all()
+        # Comptes par facette sur l'ensemble filtré (indépendants du curseur : à ne demander qu'en première page)
+        facet_results = facet_counts(query, facets, facet_limit) if facets else None
         
-        return jsonify({
-            'jobs': [job.to_dict() for job in jobs],
+        query = job_rows(join_new_state(query))
+        
+        if sort == 'relevance' and rank is not None:
+            # Résultats classés par pertinence, curseur sur (rang, date, id)
+            jobs, next_cursor = paginate_ranked(query, rank, Job.date_found, Job.id, cursor, limit)
+        else:
+            sort = 'date'
+            jobs, next_cursor = paginate_keyset(query, Job.date_found, Job.id, cursor, limit)
+        
+        payload = {
+            'jobs': rows_to_dicts(jobs),
             'total': len(jobs),
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None,
             'search_criteria': {
                 'query': query_text,
                 'platforms': platforms,
                 'job_types': job_types,
-                'limit': limit
+                'limit': limit,
+                'cursor': cursor,
+                'sort': sort,
+                'fulltext': rank is not None
             }
-        }), 200
+        }
+        if facet_results is not None:
+            payload['facets'] = facet_results
+        
+        return json_response(payload), 200
         
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': f'Internal server error: {str(e)}'}), 500
@@ -4,7 +4,10 @@ Routes pour le contrôle du système de scraping
 """
 from flask import Blueprint, jsonify, request
 from app.services.scraping_service import ScrapingService
-from app.models import Search, ExecutionLog, Job
+from app.models import Search, ExecutionLog
+from app.utils.database import DatabaseUtils
+from app.utils.pagination import paginate_keyset, InvalidCursor
+from app.utils.ratelimit import limiter, scrape_limit
 from datetime import datetime, timedelta
 import logging
 
@@ -138,6 +141,7 @@ def unschedule_search(search_id):
         return jsonify({'error': str(e)}), 500
 
 @scraping_bp.route('/search/<int:search_id>/execute', methods=['POST'])
+@limiter.limit(scrape_limit)
 def execute_search_now(search_id):
     """Exécute immédiatement une recherche"""
     try:
@@ -170,9 +174,9 @@ def get_search_logs(search_id):
     try:
         search = Search.query.get_or_404(search_id)
         
-        # Paramètres de pagination
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 20, type=int)
+        # Paramètres de pagination (curseur keyset)
+        cursor = request.args.get('cursor')
+        per_page = max(1, min(request.args.get('per_page', 20, type=int), 200))  # 1 à 200
         
         # Filtre par date (optionnel)
         days = request.args.get('days', 7, type=int)
@@ -180,15 +184,14 @@ def get_search_logs(search_id):
         
         # Query avec pagination
         logs_query = ExecutionLog.query.filter_by(search_id=search_id)\
-            .filter(ExecutionLog.executed_at >= since_date)\
-            .order_by(ExecutionLog.executed_at.desc())
+            .filter(ExecutionLog.executed_at >= since_date)
         
-        logs_pagination = logs_query.paginate(
-            page=page, per_page=per_page, error_out=False
+        logs, next_cursor = paginate_keyset(
+            logs_query, ExecutionLog.executed_at, ExecutionLog.id, cursor, per_page
         )
         
         logs_data = []
-        for log in logs_pagination.items:
+        for log in logs:
             logs_data.append({
                 'id': log.id,
                 'platform': log.platform,
@@ -203,12 +206,10 @@ def get_search_logs(search_id):
         return jsonify({
             'logs': logs_data,
             'pagination': {
-                'page': page,
                 'per_page': per_page,
-                'total': logs_pagination.total,
-                'pages': logs_pagination.pages,
-                'has_next': logs_pagination.has_next,
-                'has_prev': logs_pagination.has_prev
+                'cursor': cursor,
+                'next_cursor': next_cursor,
+                'has_next': next_cursor is not None
             },
             'search': {
                 'id': search.id,
@@ -217,6 +218,8 @@ def get_search_logs(search_id):
             }
         })
         
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         logger.error(f"Error getting logs for search {search_id}: {e}")
         return jsonify({'error': str(e)}), 500
@@ -227,72 +230,21 @@ def get_scraping_stats():
     try:
         # Paramètres de période
         days = request.args.get('days', 7, type=int)
-        since_date = datetime.now() - timedelta(days=days)
+        since_date = datetime.utcnow() - timedelta(days=days)
         
-        # Statistiques générales
+        # Statistiques générales (compteurs matérialisés)
         total_searches = Search.query.filter_by(is_active=True).count()
-        total_jobs = Job.query.count()
-        
-        # Statistiques récentes
-        recent_logs = ExecutionLog.query.filter(
-            ExecutionLog.executed_at >= since_date
-        ).all()
-        
-        recent_executions = len(recent_logs)
-        recent_jobs_found = sum(log.jobs_found for log in recent_logs)
-        recent_new_jobs = sum(log.new_jobs_found for log in recent_logs)
-        
-        # Statistiques par plateforme
-        platform_stats = {}
-        for log in recent_logs:
-            if log.platform not in platform_stats:
-                platform_stats[log.platform] = {
-                    'executions': 0,
-                    'jobs_found': 0,
-                    'new_jobs': 0,
-                    'success_rate': 0,
-                    'avg_execution_time': 0
-                }
-            
-            stats = platform_stats[log.platform]
-            stats['executions'] += 1
-            stats['jobs_found'] += log.jobs_found
-            stats['new_jobs'] += log.new_jobs_found
-            
-            if log.status == 'success':
-                stats['success_rate'] += 1
-        
-        # Calculer les moyennes
-        for platform, stats in platform_stats.items():
-            if stats['executions'] > 0:
-                stats['success_rate'] = (stats['success_rate'] / stats['executions']) * 100
-                
-                # Moyenne du temps d'exécution
-                platform_logs = [log for log in recent_logs if log.platform == platform]
-                if platform_logs:
-                    stats['avg_execution_time'] = sum(
-                        log.execution_time for log in platform_logs
-                    ) / len(platform_logs)
-        
-        # Jobs récents par recherche
-        search_stats = []
-        active_searches = Search.query.filter_by(is_active=True).all()
-        
-        for search in active_searches:
-            search_logs = [log for log in recent_logs if log.search_id == search.id]
-            search_jobs = Job.query.filter_by(search_id=search.id)\
-                .filter(Job.created_at >= since_date).count()
-            
-            search_stats.append({
-                'search_id': search.id,
-                'keywords': search.keywords,
-                'executions': len(search_logs),
-                'new_jobs': search_jobs,
-                'last_execution': max(
-                    (log.executed_at.isoformat() for log in search_logs),
-                    default=None
-                )
-            })
+        total_jobs = sum(stat['total'] for stat in DatabaseUtils.get_platform_counters())
+        
+        # Statistiques par plateforme depuis le rollup quotidien JobMetrics
+        platform_stats = DatabaseUtils.get_platform_metrics(since_date.date())
+        
+        recent_executions = sum(stats['executions'] for stats in platform_stats.values())
+        recent_jobs_found = sum(stats['jobs_found'] for stats in platform_stats.values())
+        recent_new_jobs = sum(stats['new_jobs'] for stats in platform_stats.values())
+        
+        # Statistiques par recherche (agrégats SQL groupés)
+        search_stats = DatabaseUtils.get_search_execution_stats(since_date)
         
         return jsonify({
             'period_days': days,
@@ -313,6 +265,7 @@ def get_scraping_stats():
         return jsonify({'error': str(e)}), 500
 
 @scraping_bp.route('/test-connection', methods=['POST'])
+@limiter.limit(scrape_limit)
 def test_scrapers_connection():
     """Test la connexion aux différents scrapers"""
     try:
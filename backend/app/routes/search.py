@@ -1,6 +1,7 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, request, jsonify
 from app.models import db
 from app.utils.database import DatabaseUtils
+from app.utils.cache import cached_response, conditional_get, invalidate_responses
 import json
 
 search_bp = Blueprint('search', __name__)
@@ -13,6 +14,40 @@ def set_scraping_service(service):
     global _scraping_service
     _scraping_service = service
 
+def _validate_search_data(data):
+    """
+    Valide les champs d'une recherche à créer
+    
+    Returns:
+        (champs validés, None) ou (None, message d'erreur)
+    """
+    if not isinstance(data, dict):
+        return None, 'No data provided'
+    
+    keywords = str(data.get('keywords') or '').strip()
+    job_types = data.get('job_types', [])
+    platforms = data.get('platforms', [])
+    duration_minutes = data.get('duration_minutes', 15)
+    
+    if not keywords:
+        return None, 'Keywords are required'
+    
+    if not job_types:
+        return None, 'At least one job type is required'
+    
+    if not platforms:
+        return None, 'At least one platform is required'
+    
+    if not isinstance(duration_minutes, int) or duration_minutes < 5 or duration_minutes > 60:
+        return None, 'Duration must be between 5 and 60 minutes'
+    
+    return {
+        'keywords': keywords,
+        'job_types': job_types,
+        'platforms': platforms,
+        'duration_minutes': duration_minutes
+    }, None
+
 @search_bp.route('/search', methods=['POST'])
 def create_search():
     """Crée une nouvelle recherche avec cron job automatique"""
@@ -23,31 +58,12 @@ def create_search():
         if not data:
             return jsonify({'error': 'No data provided'}), 400
         
-        keywords = data.get('keywords', '').strip()
-        job_types = data.get('job_types', [])
-        platforms = data.get('platforms', [])
-        duration_minutes = data.get('duration_minutes', 15)
-        
-        # Validations
-        if not keywords:
-            return jsonify({'error': 'Keywords are required'}), 400
-        
-        if not job_types:
-            return jsonify({'error': 'At least one job type is required'}), 400
-        
-        if not platforms:
-            return jsonify({'error': 'At least one platform is required'}), 400
-        
-        if duration_minutes < 5 or duration_minutes > 60:
-            return jsonify({'error': 'Duration must be between 5 and 60 minutes'}), 400
+        fields, error = _validate_search_data(data)
+        if error:
+            return jsonify({'error': error}), 400
         
         # Créer la recherche
-        search = DatabaseUtils.create_search(
-            keywords=keywords,
-            job_types=job_types,
-            platforms=platforms,
-            duration_minutes=duration_minutes
-        )
+        search = DatabaseUtils.create_search(**fields)
         
         # Programmer automatiquement la recherche si le service est disponible
         scheduled = False
@@ -66,6 +82,52 @@ def create_search():
     except Exception as e:
         return jsonify({'error': f'Internal server error: {str(e)}'}), 500
 
+@search_bp.route('/searches/batch', methods=['POST'])
+def create_searches_batch():
+    """
+    Crée plusieurs recherches en une transaction et les programme en une seule écriture
+    du jobstore, premières exécutions étalées. Corps : {"searches": [...]}.
+    Si une recherche est invalide, aucune n'est créée.
+    """
+    try:
+        data = request.get_json()
+        specs = data.get('searches') if isinstance(data, dict) else data
+        
+        if not specs or not isinstance(specs, list):
+            return jsonify({'error': 'A non-empty list of searches is required'}), 400
+        
+        max_batch = current_app.config.get('SEARCH_BATCH_MAX', 500)
+        if len(specs) > max_batch:
+            return jsonify({'error': f'At most {max_batch} searches per batch'}), 400
+        
+        validated = []
+        errors = []
+        for index, spec in enumerate(specs):
+            fields, error = _validate_search_data(spec)
+            if error:
+                errors.append({'index': index, 'error': error})
+            else:
+                validated.append(fields)
+        
+        if errors:
+            return jsonify({'error': 'Invalid searches in batch', 'errors': errors}), 400
+        
+        searches = DatabaseUtils.create_searches(validated)
+        
+        scheduled = []
+        if _scraping_service:
+            scheduled = _scraping_service.schedule_searches(searches)
+        
+        return jsonify({
+            'message': f'{len(searches)} searches created successfully',
+            'searches': [search.to_dict((0, 0)) for search in searches],
+            'created': len(searches),
+            'scheduled': len(scheduled)
+        }), 201
+        
+    except Exception as e:
+        return jsonify({'error': f'Internal server error: {str(e)}'}), 500
+
 @search_bp.route('/search/<int:search_id>', methods=['GET'])
 def get_search(search_id):
     """Récupère les détails d'une recherche"""
@@ -119,6 +181,7 @@ def update_search(search_id):
             search.is_active = bool(data['is_active'])
         
         db.session.commit()
+        invalidate_responses()
         
         # Reprogrammer si nécessaire
         rescheduled = False
@@ -147,8 +210,13 @@ def update_search(search_id):
 
 @search_bp.route('/search/<int:search_id>', methods=['DELETE'])
 def delete_search(search_id):
-    """Supprime une recherche et arrête son cron job"""
+    """
+    Désactive une recherche et arrête son cron job
+    (?purge=true : supprime définitivement la recherche, ses offres et ses logs)
+    """
     try:
+        purge = request.args.get('purge', 'false').lower() == 'true'
+        
         search = DatabaseUtils.get_search_by_id(search_id)
         if not search:
             return jsonify({'error': 'Search not found'}), 404
@@ -161,6 +229,14 @@ def delete_search(search_id):
             except Exception as e:
                 print(f"Warning: Failed to unschedule search {search_id}: {e}")
         
+        if purge:
+            deleted = DatabaseUtils.delete_search(search_id)
+            return jsonify({
+                'message': 'Search deleted successfully',
+                'deleted': deleted,
+                'unscheduled': unscheduled
+            }), 200
+        
         # Désactiver la recherche au lieu de la supprimer (pour garder l'historique)
         success = DatabaseUtils.deactivate_search(search_id)
         
@@ -176,6 +252,8 @@ def delete_search(search_id):
         return jsonify({'error': f'Internal server error: {str(e)}'}), 500
 
 @search_bp.route('/searches', methods=['GET'])
+@conditional_get
+@cached_response()
 def list_searches():
     """Liste toutes les recherches"""
     try:
@@ -188,8 +266,11 @@ def list_searches():
             from app.models import Search
             searches = Search.query.order_by(Search.created_at.desc()).all()
         
+        # Nombre d'offres de toutes les recherches en une seule requête
+        job_counts = DatabaseUtils.get_search_job_counts()
+        
         return jsonify({
-            'searches': [search.to_dict() for search in searches],
+            'searches': [search.to_dict(job_counts.get(search.id, (0, 0))) for search in searches],
             'total': len(searches)
         }), 200
         
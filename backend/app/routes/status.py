@@ -1,11 +1,16 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, jsonify, request
 from app.models import db, Search, ExecutionLog
 from app.utils.database import DatabaseUtils
+from app.utils.engine import get_pool_stats
+from app.utils.cache import cached_response
+from app.utils.ratelimit import limiter
+from app.utils.metrics import metrics as metrics_registry, DB_POOL_CONNECTIONS, PROMETHEUS_CONTENT_TYPE
 from datetime import datetime
 
 status_bp = Blueprint('status', __name__)
 
 @status_bp.route('/status', methods=['GET'])
+@cached_response()
 def get_global_status():
     """Récupère le statut global de l'application"""
     try:
@@ -21,26 +26,23 @@ def get_global_status():
         issues = []
         
         # Vérifier s'il y a des recherches actives sans exécution récente
-        active_searches = DatabaseUtils.get_active_searches()
-        for search in active_searches:
-            last_log = ExecutionLog.query.filter_by(search_id=search.id)\
-                                        .order_by(ExecutionLog.executed_at.desc())\
-                                        .first()
-            
-            if last_log:
-                time_since_last = datetime.utcnow() - last_log.executed_at
-                expected_interval_minutes = search.duration_minutes
+        # (dernière exécution de toutes les recherches en une seule requête)
+        now = datetime.utcnow()
+        for search_id, expected_interval_minutes, last_run in DatabaseUtils.get_last_execution_times():
+            if last_run:
+                time_since_last = now - last_run
                 
                 # Si plus de 2x l'intervalle attendu, c'est un problème
                 if time_since_last.total_seconds() > (expected_interval_minutes * 2 * 60):
                     health_status = "warning"
-                    issues.append(f"Search {search.id} hasn't run for {int(time_since_last.total_seconds() / 60)} minutes")
+                    issues.append(f"Search {search_id} hasn't run for {int(time_since_last.total_seconds() / 60)} minutes")
         
         return jsonify({
             'status': health_status,
             'timestamp': datetime.utcnow().isoformat(),
             'stats': dashboard_stats,
             'recent_executions': [log.to_dict() for log in recent_logs],
+            'database': {'pools': get_pool_stats()},
             'issues': issues
         }), 200
         
@@ -143,6 +145,7 @@ def get_execution_logs():
         return jsonify({'error': f'Internal server error: {str(e)}'}), 500
 
 @status_bp.route('/status/health', methods=['GET'])
+@limiter.exempt
 def health_check():
     """Endpoint de santé pour monitoring"""
     try:
@@ -160,7 +163,8 @@ def health_check():
             'basic_stats': {
                 'total_searches': total_searches,
                 'active_searches': active_searches
-            }
+            },
+            'pools': get_pool_stats()
         }), 200
         
     except Exception as e:
@@ -172,11 +176,13 @@ def health_check():
         }), 500
 
 @status_bp.route('/status/metrics', methods=['GET'])
+@cached_response()
 def get_metrics():
     """Récupère les métriques pour monitoring (format Prometheus-like)"""
     try:
         stats = DatabaseUtils.get_dashboard_stats()
-        trends = DatabaseUtils.get_job_trends(days=1)  # Dernières 24h
+        trends = DatabaseUtils.get_job_trends(days=1)  # Hier et aujourd'hui (colonne day_found)
+        today = datetime.utcnow().strftime('%Y-%m-%d')
         
         # Format simple pour les métriques
         metrics = {
@@ -186,7 +192,8 @@ def get_metrics():
             'jobhub_jobs_new': stats['new_jobs'],
             'jobhub_jobs_24h': stats['jobs_24h'],
             'jobhub_platforms_count': len(stats['platform_stats']),
-            'jobhub_trends_today': len(trends)
+            'jobhub_trends_today': len(trends),
+            'jobhub_jobs_today': sum(trend['count'] for trend in trends if trend['date'] == today)
         }
         
         # Ajouter les métriques par plateforme
@@ -195,6 +202,12 @@ def get_metrics():
             metrics[f'jobhub_jobs_platform_{platform}_total'] = platform_stat['total']
             metrics[f'jobhub_jobs_platform_{platform}_new'] = platform_stat['new']
         
+        # Utilisation des pools de connexions
+        for bind, pool in get_pool_stats().items():
+            for key in ('size', 'checked_out', 'overflow', 'waiting'):
+                if pool.get(key) is not None:
+                    metrics[f'jobhub_db_pool_{bind}_{key}'] = pool[key]
+        
         return jsonify({
             'metrics': metrics,
             'timestamp': datetime.utcnow().isoformat()
@@ -202,3 +215,22 @@ def get_metrics():
         
     except Exception as e:
         return jsonify({'error': f'Internal server error: {str(e)}'}), 500
+
+@status_bp.route('/status/metrics/prometheus', methods=['GET'])
+@limiter.exempt
+def get_prometheus_metrics():
+    """
+    Métriques du processus au format texte Prometheus (latences des scrapers, exécutions,
+    transactions d'écriture, pools). Aucune requête en base : valeurs tenues en mémoire.
+    """
+    try:
+        for bind, pool in get_pool_stats().items():
+            for key in ('size', 'checked_out', 'overflow', 'waiting'):
+                if pool.get(key) is not None:
+                    DB_POOL_CONNECTIONS.set(pool[key], bind=bind, state=key)
+        
+        return Response(metrics_registry.render(), content_type=PROMETHEUS_CONTENT_TYPE,
+                        headers={'Cache-Control': 'no-store'})
+        
+    except Exception as e:
+        return jsonify({'error': f'Internal server error: {str(e)}'}), 500
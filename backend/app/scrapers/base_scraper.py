@@ -10,6 +10,10 @@ import random
 from bs4 import BeautifulSoup
 import logging
 from typing import List, Dict, Optional
+from app.utils.metrics import (
+    SCRAPER_REQUESTS, SCRAPER_REQUEST_DURATION, SCRAPER_RETRIES, SCRAPER_PARSE_DURATION,
+    SCRAPE_DURATION, SCRAPE_JOBS_FOUND
+)
 
 # Configuration du logging
 logging.basicConfig(level=logging.INFO)
@@ -57,13 +61,16 @@ class BaseScraper(ABC):
             time.sleep(delay)
             
             logger.info(f"[{self.name}] Making request to: {url}")
-            response = self.session.get(url, params=params, timeout=self.timeout)
+            with SCRAPER_REQUEST_DURATION.time(platform=self.name):
+                response = self.session.get(url, params=params, timeout=self.timeout)
+            SCRAPER_REQUESTS.inc(platform=self.name, status=response.status_code)
             
             if response.status_code == 200:
                 return response
             elif response.status_code == 429 and retries < self.max_retries:
                 # Rate limiting - attendre plus longtemps
                 wait_time = (2 ** retries) * 60  # Backoff exponentiel
+                SCRAPER_RETRIES.inc(platform=self.name, reason='rate_limited')
                 logger.warning(f"[{self.name}] Rate limited, waiting {wait_time}s...")
                 time.sleep(wait_time)
                 return self._make_request(url, params, retries + 1)
@@ -72,7 +79,9 @@ class BaseScraper(ABC):
                 return None
                 
         except requests.RequestException as e:
+            SCRAPER_REQUESTS.inc(platform=self.name, status='error')
             if retries < self.max_retries:
+                SCRAPER_RETRIES.inc(platform=self.name, reason='error')
                 logger.warning(f"[{self.name}] Request failed, retrying... ({retries + 1}/{self.max_retries})")
                 time.sleep(2 ** retries)  # Backoff exponentiel
                 return self._make_request(url, params, retries + 1)
@@ -174,6 +183,7 @@ class BaseScraper(ABC):
         
         all_jobs = []
         page = 1
+        scrape_start = time.perf_counter()
         
         try:
             while len(all_jobs) < limit:
@@ -187,10 +197,12 @@ class BaseScraper(ABC):
                 if not response:
                     break
                 
+                parse_start = time.perf_counter()
                 soup = self._parse_html(response.text)
                 job_listings = self.get_job_listings(soup)
                 
                 if not job_listings:
+                    SCRAPER_PARSE_DURATION.observe(time.perf_counter() - parse_start, platform=self.name)
                     logger.info(f"[{self.name}] No more jobs found on page {page}")
                     break
                 
@@ -205,6 +217,7 @@ class BaseScraper(ABC):
                     except Exception as e:
                         logger.warning(f"[{self.name}] Error parsing job: {e}")
                         continue
+                SCRAPER_PARSE_DURATION.observe(time.perf_counter() - parse_start, platform=self.name)
                 
                 all_jobs.extend(page_jobs[:limit - len(all_jobs)])
                 logger.info(f"[{self.name}] Page {page}: {len(page_jobs)} jobs found")
@@ -225,9 +238,12 @@ class BaseScraper(ABC):
                     break
             
         except Exception as e:
+            SCRAPE_DURATION.observe(time.perf_counter() - scrape_start, platform=self.name, status='error')
             logger.error(f"[{self.name}] Scraping error: {e}")
             raise ScrapingError(f"Error during scraping: {e}")
         
+        SCRAPE_DURATION.observe(time.perf_counter() - scrape_start, platform=self.name, status='success')
+        SCRAPE_JOBS_FOUND.inc(len(all_jobs), platform=self.name)
         logger.info(f"[{self.name}] Scraping completed: {len(all_jobs)} jobs found")
         return all_jobs
     
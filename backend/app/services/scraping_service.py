@@ -3,17 +3,95 @@
 Service de scraping automatique avec APScheduler
 """
 import logging
+import pickle
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 from typing import List, Dict
 from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.schedulers.base import STATE_RUNNING
 from apscheduler.triggers.interval import IntervalTrigger
 from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
+from apscheduler.jobstores.memory import MemoryJobStore
+from apscheduler.util import datetime_to_utc_timestamp
 from app.models import db, Search, Job, ExecutionLog
 from app.utils.database import DatabaseUtils
+from app.utils.cache import invalidate_responses
+from app.utils.events import job_events
+from app.utils.serialization import new_job_payload
+from app.utils.profiling import profiling_scope
+from app.utils.metrics import (
+    SEARCH_EXECUTIONS, SEARCH_EXECUTION_DURATION, SEARCHES_IN_PROGRESS,
+    JOBS_SAVED, JOBS_DUPLICATE, DB_COMMIT_DURATION
+)
 from app.scrapers import ScraperManager, ScrapingError
+from app.utils.engine import WriteQueue, SCRAPER_BIND, is_sqlite_uri, is_memory_sqlite_uri, use_bind
 
 logger = logging.getLogger(__name__)
 
+# Référence textuelle des tâches de recherche : sérialisable par le jobstore SQLAlchemy
+# (une méthode liée au service ne l'est pas)
+SCHEDULED_SEARCH_FUNC = 'app.services.scraping_service:run_scheduled_search'
+
+# Service courant, utilisé par les tâches persistées
+_service = None
+
+
+def run_scheduled_search(search_id: int):
+    """Point d'entrée des tâches de recherche programmées"""
+    if _service is None:
+        logger.warning(f"Scraping service not initialized, skipping search {search_id}")
+        return
+    _service._execute_search(search_id)
+
+
+class BulkSQLAlchemyJobStore(SQLAlchemyJobStore):
+    """
+    Jobstore SQLAlchemy capable d'enregistrer de nombreuses tâches en une transaction.
+    Dans batch(), les tâches ajoutées par scheduler.add_job() (API publique : valeurs par
+    défaut, événements, réveil) sont mises de côté puis écrites ensemble à la sortie du bloc.
+    """
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Propre au thread appelant : les mises à jour du thread du scheduler restent immédiates
+        self._batch = threading.local()
+    
+    @contextmanager
+    def batch(self):
+        """Regroupe les add_job() du thread courant (une tâche existante est remplacée)"""
+        self._batch.jobs = {}
+        try:
+            yield
+            jobs = list(self._batch.jobs.values())
+        finally:
+            self._batch.jobs = None
+        self.add_jobs(jobs)
+    
+    def add_job(self, job):
+        pending = getattr(self._batch, 'jobs', None)
+        if pending is None:
+            return super().add_job(job)
+        pending[job.id] = job
+    
+    def add_jobs(self, jobs: list):
+        """Enregistre (ou remplace) des tâches en une seule transaction"""
+        if not jobs:
+            return
+        rows = [
+            {
+                'id': job.id,
+                'next_run_time': datetime_to_utc_timestamp(job.next_run_time),
+                'job_state': pickle.dumps(job.__getstate__(), self.pickle_protocol)
+            }
+            for job in jobs
+        ]
+        with self.engine.begin() as connection:
+            connection.execute(self.jobs_t.delete().where(self.jobs_t.c.id.in_([row['id'] for row in rows])))
+            connection.execute(self.jobs_t.insert(), rows)
+
+
 class ScrapingService:
     """Service principal de scraping automatique"""
     
@@ -21,6 +99,9 @@ class ScrapingService:
         self.app = app
         self.scheduler = None
         self.scraper_manager = ScraperManager()
+        self.write_queue = None
+        self.jobstore = None
+        self.job_defaults = {}
         self.is_running = False
         
         if app:
@@ -28,14 +109,29 @@ class ScrapingService:
     
     def init_app(self, app):
         """Initialise le service avec l'application Flask"""
+        global _service
         self.app = app
+        _service = self
+        database_uri = app.config['SQLALCHEMY_DATABASE_URI']
         
-        # Configuration du scheduler
+        # Le jobstore partage le moteur de l'application (et donc son profil SQLite)
+        with app.app_context():
+            engine = db.engine
+        
+        self.jobstore = BulkSQLAlchemyJobStore(engine=engine)
         jobstores = {
-            'default': SQLAlchemyJobStore(url=app.config['SQLALCHEMY_DATABASE_URI'])
+            'default': self.jobstore,
+            # Tâches de maintenance internes, reprogrammées à chaque démarrage
+            'maintenance': MemoryJobStore()
         }
         
-        job_defaults = {
+        # File d'écriture unique pour SQLite : les threads de scraping ne se
+        # disputent plus le verrou d'écriture
+        if (is_sqlite_uri(database_uri) and not is_memory_sqlite_uri(database_uri)
+                and app.config.get('SQLITE_SINGLE_WRITER', True)):
+            self.write_queue = WriteQueue(app)
+        
+        self.job_defaults = {
             'coalesce': True,
             'max_instances': 3,
             'misfire_grace_time': 300  # 5 minutes
@@ -43,7 +139,7 @@ class ScrapingService:
         
         self.scheduler = BackgroundScheduler(
             jobstores=jobstores,
-            job_defaults=job_defaults,
+            job_defaults=self.job_defaults,
             timezone=app.config.get('SCHEDULER_TIMEZONE', 'Europe/Paris')
         )
     
@@ -59,6 +155,7 @@ class ScrapingService:
             
             # Programmer les recherches existantes
             self._schedule_existing_searches()
+            self._schedule_maintenance()
         else:
             logger.warning("Scheduler is already running")
     
@@ -68,15 +165,75 @@ class ScrapingService:
             self.scheduler.shutdown()
             self.is_running = False
             logger.info("⏹️ Scraping scheduler stopped")
+        
+        if self.write_queue:
+            self.write_queue.stop()
+    
+    def _write(self, func, *args, **kwargs):
+        """Exécute une écriture via la file d'écriture unique si elle est active"""
+        if self.write_queue:
+            return self.write_queue.run(func, *args, **kwargs)
+        return func(*args, **kwargs)
+    
+    def _schedule_maintenance(self):
+        """Programme les tâches de maintenance périodiques"""
+        reconcile_minutes = self.app.config.get('COUNTER_RECONCILE_MINUTES', 60)
+        if reconcile_minutes:
+            self.scheduler.add_job(
+                func=self._reconcile_counters,
+                trigger=IntervalTrigger(minutes=reconcile_minutes),
+                id='maintenance_reconcile_counters',
+                name='Reconcile job counters',
+                jobstore='maintenance',
+                replace_existing=True
+            )
+        
+        retention_hours = self.app.config.get('RETENTION_INTERVAL_HOURS', 24)
+        if retention_hours:
+            self.scheduler.add_job(
+                func=self._apply_retention,
+                trigger=IntervalTrigger(hours=retention_hours),
+                id='maintenance_retention',
+                name='Purge old jobs and logs',
+                jobstore='maintenance',
+                replace_existing=True
+            )
+    
+    def _reconcile_counters(self):
+        """Recalcule les compteurs matérialisés depuis la table des offres"""
+        def reconcile():
+            with self.app.app_context():
+                return DatabaseUtils.reconcile_counters()
+        
+        try:
+            rows = self._write(reconcile)
+            logger.info(f"🔢 Job counters reconciled ({rows} rows)")
+        except Exception as e:
+            logger.error(f"Failed to reconcile job counters: {e}")
+    
+    def _apply_retention(self):
+        """Supprime par lots les offres et logs au-delà de la durée de rétention"""
+        def write(func, *args):
+            def run():
+                with self.app.app_context():
+                    return func(*args)
+            return self._write(run)
+        
+        try:
+            with self.app.app_context():
+                deleted = DatabaseUtils.apply_retention(self.app.config, write=write)
+            logger.info(f"🧹 Retention applied: {deleted['jobs']} jobs, {deleted['execution_logs']} logs, "
+                        f"{deleted['job_changes']} changes deleted")
+        except Exception as e:
+            logger.error(f"Failed to apply retention: {e}")
     
     def _schedule_existing_searches(self):
         """Programme toutes les recherches actives existantes"""
         with self.app.app_context():
             active_searches = Search.query.filter_by(is_active=True).all()
             
-            for search in active_searches:
-                self.schedule_search(search.id)
-                logger.info(f"📅 Scheduled search {search.id}: '{search.keywords}'")
+            scheduled = self.schedule_searches(active_searches)
+            logger.info(f"📅 Scheduled {len(scheduled)} existing searches")
     
     def schedule_search(self, search_id: int) -> bool:
         """
@@ -106,7 +263,7 @@ class ScrapingService:
                 # Créer nouveau job
                 trigger = IntervalTrigger(minutes=search.duration_minutes)
                 self.scheduler.add_job(
-                    func=self._execute_search,
+                    func=SCHEDULED_SEARCH_FUNC,
                     trigger=trigger,
                     args=[search_id],
                     id=job_id,
@@ -121,6 +278,57 @@ class ScrapingService:
             logger.error(f"❌ Failed to schedule search {search_id}: {e}")
             return False
     
+    def schedule_searches(self, searches: List[Search]) -> List[int]:
+        """
+        Programme plusieurs recherches en une seule écriture dans le jobstore.
+        Les premières exécutions sont étalées sur l'intervalle de chaque recherche
+        pour ne pas lancer tous les scrapings au même instant.
+        
+        Args:
+            searches: Recherches (déjà chargées) à programmer
+        
+        Returns:
+            IDs des recherches programmées
+        """
+        searches = [search for search in searches if search.is_active]
+        if not searches:
+            return []
+        
+        try:
+            now = datetime.now(self.scheduler.timezone)
+            # Scheduler en pause pendant l'écriture groupée : add_job() ne le réveille pas à
+            # chaque tâche (une lecture du jobstore par réveil) ; resume() le réveille une fois
+            running = self.scheduler.state == STATE_RUNNING
+            if running:
+                self.scheduler.pause()
+            try:
+                # Scheduler démarré : une seule écriture dans le jobstore à la sortie du bloc ;
+                # arrêté : tâches en attente, enregistrées à son démarrage
+                with self.jobstore.batch():
+                    for index, search in enumerate(searches):
+                        interval = timedelta(minutes=search.duration_minutes)
+                        # Recherche i sur n : première exécution après (i + 1) / n intervalle
+                        start_date = now + interval * (index + 1) / len(searches)
+                        self.scheduler.add_job(
+                            func=SCHEDULED_SEARCH_FUNC,
+                            trigger=IntervalTrigger(minutes=search.duration_minutes, start_date=start_date,
+                                                    timezone=self.scheduler.timezone),
+                            args=[search.id],
+                            id=f"search_{search.id}",
+                            name=f"Search: {search.keywords}",
+                            replace_existing=True
+                        )
+            finally:
+                if running:
+                    self.scheduler.resume()
+            
+            logger.info(f"✅ Scheduled {len(searches)} searches, first runs staggered over their interval")
+            return [search.id for search in searches]
+            
+        except Exception as e:
+            logger.error(f"❌ Failed to schedule {len(searches)} searches: {e}")
+            return []
+    
     def unschedule_search(self, search_id: int) -> bool:
         """Annule la programmation d'une recherche"""
         try:
@@ -139,21 +347,38 @@ class ScrapingService:
         Args:
             search_id: ID de la recherche à exécuter
         """
+        start = time.perf_counter()
+        status = 'error'
+        with SEARCHES_IN_PROGRESS.track_in_progress(), profiling_scope('search', f'search {search_id}'):
+            try:
+                status = self._run_search(search_id)
+            finally:
+                SEARCH_EXECUTIONS.inc(status=status)
+                SEARCH_EXECUTION_DURATION.observe(time.perf_counter() - start)
+    
+    def _run_search(self, search_id: int) -> str:
+        """
+        Scrape les plateformes d'une recherche et enregistre les résultats
+        
+        Returns:
+            Issue de l'exécution : 'success', 'partial', 'error' ou 'skipped'
+        """
         execution_start = datetime.now()
         
         with self.app.app_context():
+            # Les scrapers utilisent leur propre pool pour ne pas affamer l'API
+            use_bind(SCRAPER_BIND)
+            
             try:
                 search = Search.query.get(search_id)
                 if not search or not search.is_active:
                     logger.warning(f"Search {search_id} no longer active, skipping")
-                    return
+                    return 'skipped'
                 
                 logger.info(f"🔍 Executing search {search_id}: '{search.keywords}'")
                 
                 # Obtenir la date de dernière exécution pour éviter les doublons
-                last_execution = ExecutionLog.query.filter_by(
-                    search_id=search_id
-                ).order_by(ExecutionLog.executed_at.desc()).first()
+                last_execution = DatabaseUtils.get_last_execution(search_id)
                 
                 since_date = None
                 if last_execution:
@@ -166,6 +391,7 @@ class ScrapingService:
                 
                 total_new_jobs = 0
                 total_jobs_found = 0
+                failed_platforms = 0
                 
                 # Scraper chaque plateforme
                 for platform in platforms:
@@ -175,12 +401,13 @@ class ScrapingService:
                         )
                         
                         if platform_jobs:
-                            new_jobs = self._save_jobs(platform_jobs, search_id)
+                            new_jobs = self._write(self._save_jobs, platform_jobs, search_id)
                             total_jobs_found += len(platform_jobs)
                             total_new_jobs += new_jobs
                             
                             # Log d'exécution par plateforme
-                            self._log_execution(
+                            self._write(
+                                self._log_execution,
                                 search_id, platform, len(platform_jobs), new_jobs,
                                 'success', execution_start
                             )
@@ -188,25 +415,34 @@ class ScrapingService:
                             logger.info(f"✅ {platform}: {len(platform_jobs)} found, {new_jobs} new")
                         else:
                             # Log même si aucun job trouvé
-                            self._log_execution(
+                            self._write(
+                                self._log_execution,
                                 search_id, platform, 0, 0, 'success', execution_start
                             )
                             
                     except Exception as e:
                         logger.error(f"❌ Error scraping {platform}: {e}")
-                        self._log_execution(
+                        failed_platforms += 1
+                        self._write(
+                            self._log_execution,
                             search_id, platform, 0, 0, 'error', execution_start, str(e)
                         )
                 
                 execution_time = (datetime.now() - execution_start).total_seconds()
                 logger.info(f"🎯 Search {search_id} completed: {total_new_jobs} new jobs in {execution_time:.1f}s")
                 
+                if not failed_platforms:
+                    return 'success'
+                return 'partial' if failed_platforms < len(platforms) else 'error'
+                
             except Exception as e:
                 logger.error(f"💥 Critical error in search execution {search_id}: {e}")
                 # Log d'erreur critique
-                self._log_execution(
+                self._write(
+                    self._log_execution,
                     search_id, 'system', 0, 0, 'error', execution_start, str(e)
                 )
+                return 'error'
     
     def _scrape_platform(self, platform: str, keywords: str, job_types: List[str], 
                         since_date: datetime = None) -> List[Dict]:
@@ -234,44 +470,62 @@ class ScrapingService:
         Returns:
             Nombre de nouveaux jobs ajoutés
         """
-        new_jobs_count = 0
+        # Ids attribués (autoflush de la détection des doublons), commit et publication dans
+        # l'ordre : un abonné du flux ne doit jamais voir un id inférieur après un id supérieur
+        with job_events.ordered_commit():
+            new_jobs = []
         
-        for job_data in jobs:
-            try:
-                # Vérifier si le job existe déjà par URL
-                existing_job = Job.query.filter_by(url=job_data.get('url')).first()
+            for job_data in jobs:
+                try:
+                    # Vérifier si le job existe déjà par URL
+                    existing_job = Job.query.filter_by(url=job_data.get('url')).first()
                 
-                if not existing_job:
-                    # Créer nouveau job
-                    job = Job(
-                        search_id=search_id,
-                        title=job_data.get('title', ''),
-                        company=job_data.get('company', ''),
-                        url=job_data.get('url', ''),
-                        platform=job_data.get('platform', ''),
-                        location=job_data.get('location'),
-                        job_type=job_data.get('job_type'),
-                        description_snippet=job_data.get('description_snippet'),
-                        salary=job_data.get('salary'),
-                        date_posted=job_data.get('date_posted', datetime.now()),
-                        external_id=job_data.get('external_id'),
-                        is_new=True
-                    )
+                    if existing_job:
+                        JOBS_DUPLICATE.inc(platform=job_data.get('platform', ''))
+                    else:
+                        # Créer nouveau job
+                        job = Job(
+                            search_id=search_id,
+                            title=job_data.get('title', ''),
+                            company=job_data.get('company', ''),
+                            url=job_data.get('url', ''),
+                            platform=job_data.get('platform', ''),
+                            location=job_data.get('location'),
+                            job_type=job_data.get('job_type'),
+                            description_snippet=job_data.get('description_snippet'),
+                            salary_info=job_data.get('salary'),
+                            date_posted=job_data.get('date_posted', datetime.now())
+                        )
                     
-                    db.session.add(job)
-                    new_jobs_count += 1
+                        db.session.add(job)
+                        new_jobs.append(job)
                 
-            except Exception as e:
-                logger.error(f"Error saving job: {e}")
-                continue
+                except Exception as e:
+                    logger.error(f"Error saving job: {e}")
+                    continue
         
-        try:
-            db.session.commit()
-            logger.info(f"💾 Saved {new_jobs_count} new jobs to database")
-        except Exception as e:
-            db.session.rollback()
-            logger.error(f"Database error: {e}")
-            new_jobs_count = 0
+            new_jobs_count = len(new_jobs)
+        
+            try:
+                with DB_COMMIT_DURATION.time(operation='save_jobs'):
+                    # Compteurs matérialisés mis à jour dans la même transaction
+                    DatabaseUtils.count_new_jobs(new_jobs)
+                    db.session.flush()
+                    DatabaseUtils.record_job_inserts(new_jobs)
+                    payloads = [new_job_payload(job) for job in new_jobs]
+                    db.session.commit()
+                invalidate_responses()
+            
+                for job in new_jobs:
+                    JOBS_SAVED.inc(platform=job.platform)
+            
+                # Diffusion aux clients /api/jobs/stream, une fois les offres commitées
+                job_events.publish(payloads)
+                logger.info(f"💾 Saved {new_jobs_count} new jobs to database")
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Database error: {e}")
+                new_jobs_count = 0
         
         return new_jobs_count
     
@@ -292,8 +546,14 @@ class ScrapingService:
                 error_message=error_message
             )
             
-            db.session.add(log)
-            db.session.commit()
+            with DB_COMMIT_DURATION.time(operation='log_execution'):
+                db.session.add(log)
+                db.session.flush()
+                
+                # Rollup quotidien par plateforme, dans la même transaction
+                DatabaseUtils.record_execution_metrics(log)
+                db.session.commit()
+            invalidate_responses()
             
         except Exception as e:
             logger.error(f"Failed to log execution: {e}")
@@ -0,0 +1,252 @@
+"""
+Cache des réponses des endpoints de lecture et ETags, invalidés par un compteur de génération
+incrémenté à chaque écriture (nouvelles offres, CRUD des recherches, offres vues)
+"""
+import hashlib
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from functools import wraps
+from urllib.parse import urlencode
+from flask import request, current_app
+from sqlalchemy import func
+from app.models import db, Search, JobChange
+
+logger = logging.getLogger(__name__)
+
+try:
+    import redis
+except ImportError:  # Backend partagé optionnel
+    redis = None
+
+
+class MemoryCacheBackend:
+    """Cache en mémoire du processus (LRU borné, expiration par TTL)"""
+
+    # La génération ne voit que les écritures de ce processus (voir database_token)
+    shared = False
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._generation = 0
+        self._lock = threading.Lock()
+        # Propre au processus : un ETag d'un autre worker ou d'avant un redémarrage ne correspond jamais
+        self._epoch = uuid.uuid4().hex[:8]
+
+    def epoch(self) -> str:
+        return self._epoch
+
+    def generation(self) -> int:
+        return self._generation
+
+    def bump(self) -> int:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            return self._generation
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value, ttl: int):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class RedisCacheBackend:
+    """Cache partagé entre processus (génération stockée dans Redis)"""
+
+    shared = True
+
+    def __init__(self, url: str, prefix: str = 'jobhub:cache'):
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self.client.set(f'{prefix}:epoch', uuid.uuid4().hex[:8], nx=True)
+
+    def epoch(self) -> str:
+        value = self.client.get(f'{self.prefix}:epoch')
+        return value.decode() if value else 'none'
+
+    def generation(self) -> int:
+        return int(self.client.get(f'{self.prefix}:generation') or 0)
+
+    def bump(self) -> int:
+        return self.client.incr(f'{self.prefix}:generation')
+
+    def get(self, key: str):
+        value = self.client.get(f'{self.prefix}:{key}')
+        return json.loads(value) if value is not None else None
+
+    def set(self, key: str, value, ttl: int):
+        self.client.set(f'{self.prefix}:{key}', json.dumps(value), ex=ttl)
+
+
+class ResponseCache:
+    """Cache des réponses JSON, clé = génération + chemin + paramètres de la requête"""
+
+    def __init__(self):
+        self.backend = None
+        self.enabled = False
+        self.ttl = 15
+        self.db_sync_seconds = 2.0
+        self._token = None
+        self._token_expires = 0.0
+
+    def init_app(self, app):
+        """Configure le cache à partir de RESPONSE_CACHE_*"""
+        self.enabled = app.config.get('RESPONSE_CACHE_ENABLED', True)
+        self.ttl = int(app.config.get('RESPONSE_CACHE_TTL', 15))
+        self.db_sync_seconds = float(app.config.get('RESPONSE_CACHE_DB_SYNC_SECONDS', 2))
+        self.backend = MemoryCacheBackend(int(app.config.get('RESPONSE_CACHE_MAX_ENTRIES', 512)))
+
+        redis_url = app.config.get('RESPONSE_CACHE_REDIS_URL')
+        if self.enabled and redis_url:
+            if redis is None:
+                logger.warning("⚠️ RESPONSE_CACHE_REDIS_URL set but redis is not installed, using in-process cache")
+            else:
+                self.backend = RedisCacheBackend(redis_url)
+
+        app.extensions['response_cache'] = self
+
+    def version(self) -> str:
+        """
+        Version des données : la génération, complétée avec le cache par processus d'un jeton
+        lu en base pour voir aussi les écritures des autres processus (workers)
+        """
+        generation = self.backend.generation()
+        if self.backend.shared or self.db_sync_seconds <= 0:
+            return str(generation)
+        return f'{generation}.{self.database_token()}'
+
+    def database_token(self) -> str:
+        """
+        Jeton en base mémorisé RESPONSE_CACHE_DB_SYNC_SECONDS : les lectures répétées ne
+        touchent pas la base, les écritures du processus sont vues aussitôt (génération) et
+        celles des autres processus après ce délai au plus
+        """
+        now = time.monotonic()
+        if self._token is None or now >= self._token_expires:
+            self._token = database_token()
+            self._token_expires = now + self.db_sync_seconds
+        return self._token
+
+    def key(self) -> str:
+        """Clé de la requête courante"""
+        args = urlencode(sorted(request.args.items(multi=True)))
+        return f'{self.version()}:{request.path}?{args}'
+
+    def etag(self) -> str:
+        """ETag de la requête courante, calculé sans exécuter la requête de listing"""
+        args = urlencode(sorted(request.args.items(multi=True)))
+        digest = hashlib.sha1(f'{request.path}?{args}'.encode()).hexdigest()[:12]
+        return f'{self.backend.epoch()}-{self.version()}-{digest}'
+
+    def invalidate(self):
+        """Invalide toutes les réponses en cache et les ETags (nouvelle génération)"""
+        if self.backend is None:
+            return
+        try:
+            self.backend.bump()
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to invalidate response cache: {e}")
+
+
+def database_token() -> str:
+    """
+    Jeton des écritures visibles en base, tous processus confondus : dernier id du journal
+    des changements d'offres (insertions, offres vues) et nombre et dernière modification
+    des recherches. Deux lectures d'index, sans parcours des offres ; les suppressions de
+    la rétention n'y figurent pas et ne sont vues que par la génération de leur processus.
+    """
+    latest_change, searches, updated_at = db.session.query(
+        db.select(func.max(JobChange.id)).scalar_subquery(),
+        func.count(Search.id),
+        func.max(Search.updated_at)
+    ).one()
+    return hashlib.sha1(f'{latest_change}:{searches}:{updated_at}'.encode()).hexdigest()[:8]
+
+
+response_cache = ResponseCache()
+
+
+def invalidate_responses():
+    """À appeler après chaque écriture visible par les endpoints en cache"""
+    response_cache.invalidate()
+
+
+def cached_response(ttl: int = None):
+    """Décorateur : sert la réponse depuis le cache tant qu'aucune écriture n'a eu lieu"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            cache = response_cache
+            if not cache.enabled or cache.backend is None or request.method != 'GET':
+                return view(*args, **kwargs)
+
+            try:
+                key = cache.key()
+                hit = cache.backend.get(key)
+            except Exception as e:
+                logger.warning(f"⚠️ Response cache unavailable: {e}")
+                return view(*args, **kwargs)
+
+            if hit is not None:
+                body, status, mimetype = hit
+                response = current_app.response_class(body, status=status, mimetype=mimetype)
+                response.headers['X-Cache'] = 'HIT'
+                return response
+
+            response = current_app.make_response(view(*args, **kwargs))
+            if response.status_code == 200 and not response.is_streamed:
+                try:
+                    cache.backend.set(key, [response.get_data(as_text=True), 200, response.mimetype],
+                                      ttl or cache.ttl)
+                except Exception as e:
+                    logger.warning(f"⚠️ Failed to store response in cache: {e}")
+            response.headers['X-Cache'] = 'MISS'
+            return response
+        return wrapper
+    return decorator
+
+
+def conditional_get(view):
+    """Décorateur : ETag faible et réponse 304 si le client a déjà la version courante"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if response_cache.backend is None or request.method != 'GET':
+            return view(*args, **kwargs)
+
+        try:
+            # Calculé avant la vue : une écriture pendant son exécution donne un ETag périmé, jamais l'inverse
+            etag = response_cache.etag()
+        except Exception as e:
+            logger.warning(f"⚠️ ETag unavailable: {e}")
+            return view(*args, **kwargs)
+
+        if request.if_none_match.contains_weak(etag):
+            response = current_app.response_class(status=304)
+        else:
+            response = current_app.make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+
+        response.set_etag(etag, weak=True)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    return wrapper
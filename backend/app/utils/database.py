@@ -1,6 +1,80 @@
-from app.models import db, Search, Job, ExecutionLog, JobMetrics
+from app.models import (
+    db, Search, Job, ExecutionLog, JobMetrics, JobCounter, JobHourlyCount, JobSeenOverride, JobChange,
+    JOB_IS_NEW, join_new_state
+)
+from app.utils.cache import invalidate_responses
+import time
+from collections import Counter
 from datetime import datetime, timedelta
-from sqlalchemy import func, and_
+from sqlalchemy import func, and_, or_, case, insert
+from sqlalchemy.dialects import postgresql, sqlite
+
+
+def _day(column):
+    """Expression SQL du jour (date) d'une colonne datetime"""
+    if db.engine.dialect.name == 'sqlite':
+        return func.date(column)
+    return func.cast(column, db.Date)
+
+
+def _hour(value):
+    """Tronque une date à l'heure"""
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+def _hour_expr(column):
+    """Expression SQL de l'heure (tronquée) d'une colonne datetime"""
+    if db.engine.dialect.name == 'sqlite':
+        # Même format de stockage que le type DateTime de SQLAlchemy pour SQLite
+        return func.strftime('%Y-%m-%d %H:00:00.000000', column)
+    return func.date_trunc('hour', column)
+
+
+def _upsert(model):
+    """Retourne un INSERT ... ON CONFLICT pour SQLite/PostgreSQL, None sinon"""
+    dialect = db.engine.dialect.name
+    if dialect == 'sqlite':
+        return sqlite.insert(model)
+    if dialect == 'postgresql':
+        return postgresql.insert(model)
+    return None
+
+
+def _increment(model, keys, increments):
+    """Incrémente atomiquement les colonnes d'une ligne de compteurs (créée si absente)"""
+    stmt = _upsert(model)
+    if stmt is not None:
+        stmt = stmt.values(**keys, **increments)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(keys),
+            set_={name: getattr(model, name) + stmt.excluded[name] for name in increments}
+        )
+        db.session.execute(stmt)
+        return
+    
+    row = db.session.get(model, tuple(keys.values()))
+    if not row:
+        row = model(**keys, **{name: 0 for name in increments})
+        db.session.add(row)
+    for name, value in increments.items():
+        setattr(row, name, getattr(row, name) + value)
+
+
+# Clé du verrou consultatif qui sérialise les écritures du journal job_changes (PostgreSQL)
+_CHANGE_JOURNAL_LOCK = 4_801_442
+
+
+def _lock_change_journal():
+    """
+    À appeler avant d'écrire dans job_changes. Sur PostgreSQL, l'id est tiré de la séquence à
+    l'insertion : deux transactions concurrentes peuvent commiter dans l'ordre inverse de leurs
+    ids, et un client ayant déjà avancé son jeton au-delà de l'id le plus haut ne verrait jamais
+    l'autre. Le verrou (tenu jusqu'au commit) aligne l'ordre des ids sur celui des commits.
+    SQLite n'a qu'une transaction d'écriture à la fois : rien à faire.
+    """
+    if db.engine.dialect.name == 'postgresql':
+        db.session.execute(db.select(func.pg_advisory_xact_lock(_CHANGE_JOURNAL_LOCK)))
+
 
 class DatabaseUtils:
     """Utilitaires pour les opérations de base de données"""
@@ -17,11 +91,36 @@ class DatabaseUtils:
             )
             db.session.add(search)
             db.session.commit()
+            invalidate_responses()
             return search
         except Exception as e:
             db.session.rollback()
             raise e
     
+    @staticmethod
+    def create_searches(search_specs):
+        """
+        Crée plusieurs recherches en une seule transaction (tout ou rien)
+        
+        Args:
+            search_specs: Dictionnaires keywords, job_types, platforms, duration_minutes
+        """
+        try:
+            # Un seul INSERT multi-lignes (l'ORM insère ligne à ligne sous SQLite pour récupérer les ids)
+            fields = ('keywords', 'job_types', 'platforms', 'duration_minutes')
+            rows = [
+                {field: getattr(search, field) for field in fields}
+                for search in (Search(**spec) for spec in search_specs)
+            ]
+            search_ids = db.session.execute(insert(Search).values(rows).returning(Search.id)).scalars().all()
+            db.session.commit()
+            invalidate_responses()
+            
+            return Search.query.filter(Search.id.in_(search_ids)).order_by(Search.id).all()
+        except Exception as e:
+            db.session.rollback()
+            raise e
+    
     @staticmethod
     def get_active_searches():
         """Récupère toutes les recherches actives"""
@@ -41,6 +140,7 @@ class DatabaseUtils:
                 search.is_active = False
                 search.updated_at = datetime.utcnow()
                 db.session.commit()
+                invalidate_responses()
                 return True
             return False
         except Exception as e:
@@ -69,20 +169,48 @@ class DatabaseUtils:
                 date_posted=kwargs.get('date_posted')
             )
             db.session.add(job)
+            DatabaseUtils.count_new_jobs([job])
+            db.session.flush()
+            DatabaseUtils.record_job_inserts([job])
             db.session.commit()
+            invalidate_responses()
             return job, True  # Nouvelle offre ajoutée
         except Exception as e:
             db.session.rollback()
             raise e
     
     @staticmethod
-    def get_jobs_for_search(search_id, limit=50, new_only=False):
-        """Récupère les offres pour une recherche donnée"""
-        query = Job.query.filter_by(search_id=search_id)
+    def jobs_query(search_id=None, new_only=False, platform=None, hours=None):
+        """
+        Construit la requête des offres avec les filtres optionnels, jointe par
+        join_new_state() (état "nouvelle" lisible par JOB_IS_NEW)
+        """
+        query = join_new_state(Job.query)
+        
+        if search_id:
+            query = query.filter(Job.search_id == search_id)
         
         if new_only:
-            query = query.filter_by(is_new=True)
+            # Au-delà du filigrane sans état forcé (intervalle sur l'index (search_id, id)),
+            # ou forcée "nouvelle"
+            query = query.filter(or_(
+                and_(Job.id > func.coalesce(Search.seen_until_id, 0), JobSeenOverride.job_id.is_(None)),
+                JobSeenOverride.is_new == True
+            ))
         
+        if platform:
+            query = query.filter(Job.platform == platform)
+        
+        if hours:
+            since = datetime.utcnow() - timedelta(hours=hours)
+            query = query.filter(Job.date_found >= since)
+        
+        return query
+    
+    @staticmethod
+    def get_jobs_for_search(search_id, limit=50, new_only=False):
+        """Récupère les offres pour une recherche donnée"""
+        query = DatabaseUtils.jobs_query(search_id=search_id, new_only=new_only)
         return query.order_by(Job.date_found.desc()).limit(limit).all()
     
     @staticmethod
@@ -95,15 +223,257 @@ class DatabaseUtils:
     
     @staticmethod
     def mark_jobs_as_seen(search_id):
-        """Marque toutes les offres d'une recherche comme vues (is_new=False)"""
+        """
+        Marque toutes les offres d'une recherche comme vues en avançant son filigrane
+        (une ligne mise à jour, quel que soit le nombre d'offres)
+        """
         try:
-            Job.query.filter_by(search_id=search_id, is_new=True)\
-                    .update({Job.is_new: False})
+            watermark = db.session.query(func.coalesce(func.max(Job.id), 0)).scalar()
+            Search.query.filter_by(id=search_id)\
+                        .update({Search.seen_until_id: watermark}, synchronize_session=False)
+            JobSeenOverride.query.filter_by(search_id=search_id)\
+                                 .delete(synchronize_session=False)
+            JobCounter.query.filter_by(search_id=search_id)\
+                           .update({JobCounter.new_jobs: 0})
+            _lock_change_journal()
+            db.session.add(JobChange(kind='search_seen', search_id=search_id, seen_until_id=watermark))
             db.session.commit()
+            invalidate_responses()
         except Exception as e:
             db.session.rollback()
             raise e
     
+    @staticmethod
+    def set_jobs_new_state(job_ids, is_new=False):
+        """
+        Marque des offres spécifiques comme nouvelles ou vues et ajuste les compteurs.
+        L'état est forcé dans job_seen_overrides seulement s'il diffère de celui du filigrane.
+        """
+        try:
+            watermark_new = Job.id > func.coalesce(Search.seen_until_id, 0)
+            changed = join_new_state(db.session.query(Job.id, Job.search_id, Job.platform, watermark_new))\
+                                .filter(Job.id.in_(job_ids), JOB_IS_NEW != is_new).all()
+            
+            changed_ids = [job_id for job_id, _, _, _ in changed]
+            if changed_ids:
+                JobSeenOverride.query.filter(JobSeenOverride.job_id.in_(changed_ids))\
+                                     .delete(synchronize_session=False)
+                db.session.add_all(
+                    JobSeenOverride(job_id=job_id, search_id=search_id, is_new=is_new)
+                    for job_id, search_id, _, default_new in changed
+                    if bool(default_new) != is_new
+                )
+                # Recharger l'état dérivé des offres déjà présentes dans la session
+                for job_id in changed_ids:
+                    job = db.session.identity_map.get(db.session.identity_key(Job, job_id))
+                    if job is not None:
+                        db.session.expire(job, ['is_new'])
+            
+            groups = Counter((search_id, platform) for _, search_id, platform, _ in changed)
+            updated = len(changed)
+            
+            delta = 1 if is_new else -1
+            for (search_id, platform), count in groups.items():
+                JobCounter.query.filter_by(search_id=search_id, platform=platform)\
+                               .update({JobCounter.new_jobs: JobCounter.new_jobs + delta * count})
+            
+            if changed:
+                _lock_change_journal()
+                db.session.execute(insert(JobChange), [
+                    {'kind': 'new' if is_new else 'seen', 'job_id': job_id, 'search_id': search_id,
+                     'is_new': is_new, 'changed_at': datetime.utcnow()}
+                    for job_id, search_id, _, _ in changed
+                ])
+            
+            db.session.commit()
+            invalidate_responses()
+            return updated
+        except Exception as e:
+            db.session.rollback()
+            raise e
+    
+    @staticmethod
+    def record_job_inserts(jobs):
+        """
+        Ajoute les offres insérées au journal des changements.
+        S'exécute dans la transaction de l'appelant, après flush (ids attribués).
+        """
+        if not jobs:
+            return
+        now = datetime.utcnow()
+        _lock_change_journal()
+        db.session.execute(insert(JobChange), [
+            {'kind': 'insert', 'job_id': job.id, 'search_id': job.search_id, 'is_new': True, 'changed_at': now}
+            for job in jobs
+        ])
+    
+    @staticmethod
+    def get_job_changes(since, limit=500, search_id=None):
+        """
+        Changements postérieurs au jeton `since` (parcours d'intervalle sur la clé primaire)
+        
+        Returns:
+            Tuple (changements, jeton suivant, reste-t-il des changements)
+        """
+        query = JobChange.query.filter(JobChange.id > since)
+        if search_id:
+            query = query.filter(JobChange.search_id == search_id)
+        
+        changes = query.order_by(JobChange.id).limit(limit + 1).all()
+        has_more = len(changes) > limit
+        changes = changes[:limit]
+        
+        next_token = changes[-1].id if changes else since
+        return changes, next_token, has_more
+    
+    @staticmethod
+    def get_change_token_bounds():
+        """
+        Retourne (plus ancien, plus récent) jeton du journal. Journal vide (purgé par la
+        rétention) : (None, dernier id attribué par la séquence, 0 si aucun)
+        """
+        oldest, latest = db.session.query(func.min(JobChange.id), func.max(JobChange.id)).one()
+        if latest is None:
+            dialect = db.engine.dialect.name
+            if dialect == 'sqlite':
+                latest = db.session.execute(db.text(
+                    "SELECT seq FROM sqlite_sequence WHERE name = 'job_changes'"
+                )).scalar()
+            elif dialect == 'postgresql':
+                latest = db.session.execute(db.text(
+                    "SELECT last_value FROM pg_sequences WHERE sequencename = 'job_changes_id_seq'"
+                )).scalar()
+        return oldest, latest or 0
+    
+    @staticmethod
+    def count_new_jobs(jobs):
+        """
+        Met à jour les compteurs matérialisés pour des offres ajoutées à la session.
+        S'exécute dans la transaction de l'appelant, avant son commit.
+        """
+        per_search = Counter()
+        per_search_new = Counter()
+        per_hour = Counter()
+        now = datetime.utcnow()
+        
+        for job in jobs:
+            per_search[(job.search_id, job.platform)] += 1
+            if job.is_new is not False:
+                per_search_new[(job.search_id, job.platform)] += 1
+            per_hour[(_hour(job.date_found or now), job.platform)] += 1
+        
+        for (search_id, platform), count in per_search.items():
+            _increment(
+                JobCounter,
+                {'search_id': search_id, 'platform': platform},
+                {'total_jobs': count, 'new_jobs': per_search_new[(search_id, platform)]}
+            )
+        
+        for (hour, platform), count in per_hour.items():
+            _increment(JobHourlyCount, {'hour': hour, 'platform': platform}, {'jobs_found': count})
+    
+    @staticmethod
+    def reconcile_counters(hours=48):
+        """Recalcule les compteurs matérialisés depuis la table des offres (corrige toute dérive)"""
+        try:
+            JobCounter.query.delete(synchronize_session=False)
+            JobHourlyCount.query.delete(synchronize_session=False)
+            
+            counters = join_new_state(db.session.query(
+                Job.search_id,
+                Job.platform,
+                func.count(Job.id),
+                func.sum(case((JOB_IS_NEW == True, 1), else_=0))
+            )).group_by(Job.search_id, Job.platform).all()
+            
+            for search_id, platform, total, new in counters:
+                db.session.add(JobCounter(
+                    search_id=search_id, platform=platform, total_jobs=total, new_jobs=new or 0
+                ))
+            
+            since = _hour(datetime.utcnow() - timedelta(hours=hours))
+            hourly = db.session.query(Job.hour_found, Job.platform, func.count(Job.id))\
+                               .filter(Job.hour_found >= since)\
+                               .group_by(Job.hour_found, Job.platform).all()
+            
+            for bucket, platform, count in hourly:
+                db.session.add(JobHourlyCount(hour=bucket, platform=platform, jobs_found=count))
+            
+            db.session.commit()
+            invalidate_responses()
+            return len(counters)
+        except Exception as e:
+            db.session.rollback()
+            raise e
+    
+    @staticmethod
+    def get_platform_counters(search_id=None):
+        """Totaux et nouvelles offres par plateforme depuis les compteurs matérialisés"""
+        query = db.session.query(
+            JobCounter.platform,
+            func.sum(JobCounter.total_jobs),
+            func.sum(JobCounter.new_jobs)
+        )
+        if search_id is not None:
+            query = query.filter(JobCounter.search_id == search_id)
+        
+        return [
+            {'platform': platform, 'total': total or 0, 'new': new or 0}
+            for platform, total, new in query.group_by(JobCounter.platform).all()
+        ]
+    
+    @staticmethod
+    def get_search_job_counts(search_ids=None):
+        """Retourne {search_id: (total, nouvelles)} en une seule requête groupée"""
+        query = db.session.query(
+            JobCounter.search_id,
+            func.sum(JobCounter.total_jobs),
+            func.sum(JobCounter.new_jobs)
+        )
+        if search_ids is not None:
+            query = query.filter(JobCounter.search_id.in_(search_ids))
+        
+        return {
+            search_id: (total or 0, new or 0)
+            for search_id, total, new in query.group_by(JobCounter.search_id).all()
+        }
+    
+    @staticmethod
+    def count_jobs_last_hours(hours=24):
+        """Offres trouvées sur les dernières heures (à l'heure près) depuis les compteurs horaires"""
+        since = _hour(datetime.utcnow() - timedelta(hours=hours))
+        return db.session.query(func.coalesce(func.sum(JobHourlyCount.jobs_found), 0))\
+                         .filter(JobHourlyCount.hour >= since).scalar()
+    
+    @staticmethod
+    def get_last_execution(search_id):
+        """Récupère la dernière exécution d'une recherche"""
+        return ExecutionLog.query.filter_by(search_id=search_id)\
+                                 .order_by(ExecutionLog.executed_at.desc())\
+                                 .first()
+    
+    @staticmethod
+    def last_execution_times_query(active_only=True):
+        """
+        Construit la requête (search_id, duration_minutes, dernière exécution) de toutes les recherches
+        (sous-requête corrélée servie par l'index (search_id, executed_at))
+        """
+        last_run = db.session.query(func.max(ExecutionLog.executed_at))\
+                             .filter(ExecutionLog.search_id == Search.id)\
+                             .correlate(Search)\
+                             .scalar_subquery()
+        
+        query = db.session.query(Search.id, Search.duration_minutes, last_run.label('last_run'))
+        if active_only:
+            query = query.filter(Search.is_active == True)
+        
+        return query
+    
+    @staticmethod
+    def get_last_execution_times(active_only=True):
+        """Retourne [(search_id, duration_minutes, dernière exécution)] en une seule requête"""
+        return DatabaseUtils.last_execution_times_query(active_only).all()
+    
     @staticmethod
     def log_execution(search_id, platform, jobs_found=0, new_jobs_found=0, 
                      execution_time=None, status='success', error_message=None):
@@ -119,12 +489,191 @@ class DatabaseUtils:
                 error_message=error_message
             )
             db.session.add(log)
+            db.session.flush()
+            DatabaseUtils.record_execution_metrics(log)
             db.session.commit()
+            invalidate_responses()
             return log
         except Exception as e:
             db.session.rollback()
             raise e
     
+    @staticmethod
+    def record_execution_metrics(log):
+        """
+        Cumule une exécution dans le rollup JobMetrics du jour et de la plateforme.
+        S'exécute dans la transaction de l'appelant (le log doit être flushé).
+        
+        Le rollup ne sert plus qu'aux statistiques d'exécution de /api/scraping/stats :
+        les tendances d'offres par jour sont lues sur Job.day_found (get_job_trends).
+        """
+        day = (log.executed_at or datetime.utcnow()).date()
+        execution_time = log.execution_time or 0
+        succeeded = 1 if log.status == 'success' else 0
+        
+        stmt = _upsert(JobMetrics)
+        if stmt is not None:
+            stmt = stmt.values(
+                date=day,
+                platform=log.platform,
+                total_jobs_scraped=log.jobs_found or 0,
+                total_new_jobs=log.new_jobs_found or 0,
+                total_executions=1,
+                successful_executions=succeeded,
+                total_execution_time=execution_time,
+                avg_execution_time=execution_time,
+                success_rate=succeeded * 100.0,
+                created_at=datetime.utcnow()
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['date', 'platform'],
+                set_={
+                    'total_jobs_scraped': JobMetrics.total_jobs_scraped + stmt.excluded.total_jobs_scraped,
+                    'total_new_jobs': JobMetrics.total_new_jobs + stmt.excluded.total_new_jobs,
+                    'total_executions': JobMetrics.total_executions + 1,
+                    'successful_executions': JobMetrics.successful_executions + stmt.excluded.successful_executions,
+                    'total_execution_time': JobMetrics.total_execution_time + stmt.excluded.total_execution_time,
+                    'avg_execution_time': (JobMetrics.total_execution_time + stmt.excluded.total_execution_time)
+                                          / (JobMetrics.total_executions + 1),
+                    'success_rate': (JobMetrics.successful_executions + stmt.excluded.successful_executions) * 100.0
+                                    / (JobMetrics.total_executions + 1),
+                }
+            )
+            db.session.execute(stmt)
+            return
+        
+        # Autres bases : lecture-modification-écriture
+        metrics = JobMetrics.query.filter_by(date=day, platform=log.platform).first()
+        if not metrics:
+            metrics = JobMetrics(date=day, platform=log.platform, total_jobs_scraped=0, total_new_jobs=0,
+                                 total_executions=0, successful_executions=0,
+                                 total_execution_time=0)
+            db.session.add(metrics)
+        metrics.total_jobs_scraped += log.jobs_found or 0
+        metrics.total_new_jobs += log.new_jobs_found or 0
+        metrics.total_executions += 1
+        metrics.successful_executions += succeeded
+        metrics.total_execution_time += execution_time
+        metrics.avg_execution_time = metrics.total_execution_time / metrics.total_executions
+        metrics.success_rate = metrics.successful_executions * 100.0 / metrics.total_executions
+    
+    @staticmethod
+    def rebuild_job_metrics(days=None):
+        """Recalcule le rollup JobMetrics depuis les logs d'exécution (backfill)"""
+        try:
+            query = JobMetrics.query
+            logs_query = db.session.query(
+                _day(ExecutionLog.executed_at).label('day'),
+                ExecutionLog.platform,
+                func.sum(ExecutionLog.jobs_found),
+                func.sum(ExecutionLog.new_jobs_found),
+                func.count(ExecutionLog.id),
+                func.sum(case((ExecutionLog.status == 'success', 1), else_=0)),
+                func.coalesce(func.sum(ExecutionLog.execution_time), 0)
+            )
+            
+            if days:
+                since = (datetime.utcnow() - timedelta(days=days)).date()
+                query = query.filter(JobMetrics.date >= since)
+                logs_query = logs_query.filter(
+                    ExecutionLog.executed_at >= datetime.combine(since, datetime.min.time())
+                )
+            
+            query.delete(synchronize_session=False)
+            
+            rows = logs_query.group_by('day', ExecutionLog.platform).all()
+            for day, platform, scraped, new, executions, successes, total_time in rows:
+                if isinstance(day, str):
+                    day = datetime.strptime(day, '%Y-%m-%d').date()
+                db.session.add(JobMetrics(
+                    date=day,
+                    platform=platform,
+                    total_jobs_scraped=scraped or 0,
+                    total_new_jobs=new or 0,
+                    total_executions=executions,
+                    successful_executions=successes or 0,
+                    total_execution_time=total_time,
+                    avg_execution_time=total_time / executions,
+                    success_rate=(successes or 0) * 100.0 / executions
+                ))
+            
+            db.session.commit()
+            invalidate_responses()
+            return len(rows)
+        except Exception as e:
+            db.session.rollback()
+            raise e
+    
+    @staticmethod
+    def get_platform_metrics(since_date):
+        """Agrège le rollup JobMetrics par plateforme depuis une date (O(jours × plateformes))"""
+        rows = db.session.query(
+            JobMetrics.platform,
+            func.sum(JobMetrics.total_executions),
+            func.sum(JobMetrics.total_jobs_scraped),
+            func.sum(JobMetrics.total_new_jobs),
+            func.sum(JobMetrics.successful_executions),
+            func.sum(JobMetrics.total_execution_time)
+        ).filter(JobMetrics.date >= since_date)\
+         .group_by(JobMetrics.platform).all()
+        
+        return {
+            platform: {
+                'executions': executions or 0,
+                'jobs_found': scraped or 0,
+                'new_jobs': new or 0,
+                'success_rate': (successes or 0) * 100.0 / executions if executions else 0,
+                'avg_execution_time': (total_time or 0) / executions if executions else 0
+            }
+            for platform, executions, scraped, new, successes, total_time in rows
+        }
+    
+    @staticmethod
+    def get_search_execution_stats(since, active_only=True):
+        """
+        Statistiques par recherche depuis une date, en une seule requête
+        (agrégats SQL groupés par search_id au lieu de filtrer les logs en Python)
+        """
+        logs = db.session.query(
+            ExecutionLog.search_id.label('search_id'),
+            func.count(ExecutionLog.id).label('executions'),
+            func.sum(case((ExecutionLog.status == 'success', 1), else_=0)).label('successes'),
+            func.sum(ExecutionLog.jobs_found).label('jobs_found'),
+            func.avg(ExecutionLog.execution_time).label('avg_execution_time'),
+            func.max(ExecutionLog.executed_at).label('last_execution')
+        ).filter(ExecutionLog.executed_at >= since)\
+         .group_by(ExecutionLog.search_id).subquery()
+        
+        jobs = db.session.query(
+            Job.search_id.label('search_id'),
+            func.count(Job.id).label('new_jobs')
+        ).filter(Job.date_found >= since)\
+         .group_by(Job.search_id).subquery()
+        
+        query = db.session.query(
+            Search.id, Search.keywords,
+            logs.c.executions, logs.c.successes, logs.c.jobs_found,
+            logs.c.avg_execution_time, logs.c.last_execution, jobs.c.new_jobs
+        ).outerjoin(logs, logs.c.search_id == Search.id)\
+         .outerjoin(jobs, jobs.c.search_id == Search.id)
+        if active_only:
+            query = query.filter(Search.is_active == True)
+        
+        return [
+            {
+                'search_id': search_id,
+                'keywords': keywords,
+                'executions': executions or 0,
+                'jobs_found': jobs_found or 0,
+                'new_jobs': new_jobs or 0,
+                'success_rate': (successes or 0) * 100.0 / executions if executions else 0,
+                'avg_execution_time': avg_time or 0,
+                'last_execution': last_execution.isoformat() if last_execution else None
+            }
+            for search_id, keywords, executions, successes, jobs_found,
+                avg_time, last_execution, new_jobs in query.order_by(Search.id).all()
+        ]
+    
     @staticmethod
     def get_search_stats(search_id):
         """Récupère les statistiques pour une recherche"""
@@ -132,26 +681,19 @@ class DatabaseUtils:
         if not search:
             return None
         
-        total_jobs = Job.query.filter_by(search_id=search_id).count()
-        new_jobs = Job.query.filter_by(search_id=search_id, is_new=True).count()
-        
-        # Statistiques par plateforme
-        platform_stats = db.session.query(
-            Job.platform,
-            func.count(Job.id).label('count')
-        ).filter_by(search_id=search_id)\
-         .group_by(Job.platform).all()
+        # Statistiques par plateforme depuis les compteurs matérialisés
+        platform_stats = DatabaseUtils.get_platform_counters(search_id)
+        total_jobs = sum(stat['total'] for stat in platform_stats)
+        new_jobs = sum(stat['new'] for stat in platform_stats)
         
         # Dernière exécution
-        last_execution = ExecutionLog.query.filter_by(search_id=search_id)\
-                                         .order_by(ExecutionLog.executed_at.desc())\
-                                         .first()
+        last_execution = DatabaseUtils.get_last_execution(search_id)
         
         return {
             'search_id': search_id,
             'total_jobs': total_jobs,
             'new_jobs': new_jobs,
-            'platform_stats': [{'platform': stat[0], 'count': stat[1]} 
+            'platform_stats': [{'platform': stat['platform'], 'count': stat['total']} 
                              for stat in platform_stats],
             'last_execution': last_execution.to_dict() if last_execution else None,
             'is_active': search.is_active
@@ -162,19 +704,14 @@ class DatabaseUtils:
         """Récupère les statistiques globales pour le dashboard"""
         total_searches = Search.query.count()
         active_searches = Search.query.filter_by(is_active=True).count()
-        total_jobs = Job.query.count()
-        new_jobs = Job.query.filter_by(is_new=True).count()
         
-        # Jobs des dernières 24h
-        since_24h = datetime.utcnow() - timedelta(hours=24)
-        jobs_24h = Job.query.filter(Job.date_found >= since_24h).count()
+        # Compteurs matérialisés (maintenus à l'insertion et au marquage)
+        platform_stats = DatabaseUtils.get_platform_counters()
+        total_jobs = sum(stat['total'] for stat in platform_stats)
+        new_jobs = sum(stat['new'] for stat in platform_stats)
         
-        # Statistiques par plateforme
-        platform_stats = db.session.query(
-            Job.platform,
-            func.count(Job.id).label('total'),
-            func.sum(func.cast(Job.is_new, db.Integer)).label('new')
-        ).group_by(Job.platform).all()
+        # Jobs des dernières 24h
+        jobs_24h = DatabaseUtils.count_jobs_last_hours(24)
         
         return {
             'total_searches': total_searches,
@@ -182,47 +719,208 @@ class DatabaseUtils:
             'total_jobs': total_jobs,
             'new_jobs': new_jobs,
             'jobs_24h': jobs_24h,
-            'platform_stats': [
-                {
-                    'platform': stat[0], 
-                    'total': stat[1], 
-                    'new': stat[2] or 0
-                } 
-                for stat in platform_stats
-            ]
+            'platform_stats': platform_stats
         }
     
     @staticmethod
-    def cleanup_old_logs(days=30):
-        """Nettoie les anciens logs d'exécution"""
+    def run_in_batches(delete_batch, batch_size=500, pause=0.0, write=None):
+        """
+        Répète une suppression par lots jusqu'à épuisement, avec une pause entre deux lots
+        pour ne jamais garder le verrou d'écriture longtemps
+        
+        Args:
+            delete_batch: fonction(batch_size) qui supprime un lot, le commit et retourne sa taille
+            write: fonction exécutant chaque lot (ex. file d'écriture unique), appel direct par défaut
+        """
+        write = write or (lambda func, *args: func(*args))
+        total = 0
+        
+        while True:
+            deleted = write(delete_batch, batch_size)
+            total += deleted
+            if deleted < batch_size:
+                return total
+            if pause:
+                time.sleep(pause)
+    
+    @staticmethod
+    def delete_jobs_batch(condition, batch_size=500):
+        """Supprime un lot d'offres (et leurs états forcés) en décrémentant les compteurs matérialisés"""
+        try:
+            job_ids = [job_id for job_id, in db.session.query(Job.id).filter(condition)
+                                                         .order_by(Job.id).limit(batch_size)]
+            if not job_ids:
+                return 0
+            
+            in_batch = Job.id.in_(job_ids)
+            counters = join_new_state(db.session.query(
+                Job.search_id, Job.platform, func.count(Job.id), func.sum(case((JOB_IS_NEW == True, 1), else_=0))
+            )).filter(in_batch).group_by(Job.search_id, Job.platform).all()
+            
+            since = _hour(datetime.utcnow() - timedelta(hours=48))
+            hourly = db.session.query(Job.hour_found, Job.platform, func.count(Job.id))\
+                               .filter(in_batch, Job.hour_found >= since)\
+                               .group_by(Job.hour_found, Job.platform).all()
+            
+            for search_id, platform, total, new in counters:
+                JobCounter.query.filter_by(search_id=search_id, platform=platform).update({
+                    JobCounter.total_jobs: JobCounter.total_jobs - total,
+                    JobCounter.new_jobs: JobCounter.new_jobs - (new or 0)
+                }, synchronize_session=False)
+            
+            for bucket, platform, count in hourly:
+                JobHourlyCount.query.filter_by(hour=bucket, platform=platform)\
+                                    .update({JobHourlyCount.jobs_found: JobHourlyCount.jobs_found - count},
+                                            synchronize_session=False)
+            
+            # Explicite pour les bases créées sans ON DELETE CASCADE
+            JobSeenOverride.query.filter(JobSeenOverride.job_id.in_(job_ids))\
+                                 .delete(synchronize_session=False)
+            deleted = Job.query.filter(in_batch).delete(synchronize_session=False)
+            db.session.commit()
+            invalidate_responses()
+            return deleted
+        except Exception as e:
+            db.session.rollback()
+            raise e
+    
+    @staticmethod
+    def delete_rows_batch(model, condition, batch_size=500):
+        """Supprime un lot de lignes d'une table sans dépendances (logs, journal des changements)"""
         try:
-            cutoff_date = datetime.utcnow() - timedelta(days=days)
-            deleted = ExecutionLog.query.filter(ExecutionLog.executed_at < cutoff_date).delete()
+            row_ids = [row_id for row_id, in db.session.query(model.id).filter(condition)
+                                                       .order_by(model.id).limit(batch_size)]
+            if not row_ids:
+                return 0
+            
+            deleted = model.query.filter(model.id.in_(row_ids))\
+                                 .delete(synchronize_session=False)
             db.session.commit()
+            invalidate_responses()
             return deleted
         except Exception as e:
             db.session.rollback()
             raise e
     
+    @staticmethod
+    def delete_logs_batch(condition, batch_size=500):
+        """Supprime un lot de logs d'exécution"""
+        return DatabaseUtils.delete_rows_batch(ExecutionLog, condition, batch_size)
+    
+    @staticmethod
+    def delete_search(search_id, batch_size=500, pause=0.0, write=None):
+        """
+        Supprime définitivement une recherche : offres et logs par lots, puis la recherche
+        (sans charger les lignes filles en mémoire)
+        
+        Returns:
+            Dictionnaire du nombre de lignes supprimées, ou None si la recherche n'existe pas
+        """
+        if not db.session.get(Search, search_id):
+            return None
+        
+        jobs = DatabaseUtils.run_in_batches(
+            lambda size: DatabaseUtils.delete_jobs_batch(Job.search_id == search_id, size),
+            batch_size, pause, write
+        )
+        logs = DatabaseUtils.run_in_batches(
+            lambda size: DatabaseUtils.delete_logs_batch(ExecutionLog.search_id == search_id, size),
+            batch_size, pause, write
+        )
+        
+        def delete_row():
+            try:
+                JobCounter.query.filter_by(search_id=search_id).delete(synchronize_session=False)
+                JobSeenOverride.query.filter_by(search_id=search_id).delete(synchronize_session=False)
+                Search.query.filter_by(id=search_id).delete(synchronize_session=False)
+                db.session.commit()
+                invalidate_responses()
+            except Exception as e:
+                db.session.rollback()
+                raise e
+        
+        (write or (lambda func: func()))(delete_row)
+        return {'jobs': jobs, 'execution_logs': logs}
+    
+    @staticmethod
+    def cleanup_old_logs(days=30, batch_size=500, pause=0.0, write=None):
+        """Nettoie les anciens logs d'exécution, par lots"""
+        cutoff_date = datetime.utcnow() - timedelta(days=days)
+        return DatabaseUtils.run_in_batches(
+            lambda size: DatabaseUtils.delete_logs_batch(ExecutionLog.executed_at < cutoff_date, size),
+            batch_size, pause, write
+        )
+    
+    @staticmethod
+    def cleanup_old_jobs(days, batch_size=500, pause=0.0, write=None):
+        """Supprime les offres trouvées il y a plus de `days` jours, par lots"""
+        cutoff_date = datetime.utcnow() - timedelta(days=days)
+        return DatabaseUtils.run_in_batches(
+            lambda size: DatabaseUtils.delete_jobs_batch(Job.date_found < cutoff_date, size),
+            batch_size, pause, write
+        )
+    
+    @staticmethod
+    def apply_retention(config, write=None):
+        """Applique la politique de rétention configurée (RETENTION_*)"""
+        options = {
+            'batch_size': config.get('RETENTION_BATCH_SIZE', 500),
+            'pause': config.get('RETENTION_PAUSE_SECONDS', 0.2),
+            'write': write
+        }
+        deleted = {'jobs': 0, 'execution_logs': 0, 'job_changes': 0}
+        
+        if config.get('RETENTION_JOBS_DAYS'):
+            deleted['jobs'] = DatabaseUtils.cleanup_old_jobs(config['RETENTION_JOBS_DAYS'], **options)
+        if config.get('RETENTION_LOGS_DAYS'):
+            deleted['execution_logs'] = DatabaseUtils.cleanup_old_logs(config['RETENTION_LOGS_DAYS'], **options)
+        if config.get('RETENTION_CHANGES_DAYS'):
+            cutoff = datetime.utcnow() - timedelta(days=config['RETENTION_CHANGES_DAYS'])
+            deleted['job_changes'] = DatabaseUtils.run_in_batches(
+                lambda size: DatabaseUtils.delete_rows_batch(JobChange, JobChange.changed_at < cutoff, size),
+                options['batch_size'], options['pause'], write
+            )
+        
+        return deleted
+    
     @staticmethod
     def get_job_trends(days=7):
-        """Récupère les tendances des offres sur les derniers jours"""
-        since = datetime.utcnow() - timedelta(days=days)
-        
-        # Grouper par jour
-        trends = db.session.query(
-            func.date(Job.date_found).label('date'),
-            func.count(Job.id).label('count'),
-            Job.platform
-        ).filter(Job.date_found >= since)\
-         .group_by(func.date(Job.date_found), Job.platform)\
-         .order_by(func.date(Job.date_found).desc()).all()
+        """
+        Récupère les tendances des offres sur les derniers jours
+        (parcours d'intervalle sur l'index (day_found, platform))
+        """
+        since = (datetime.utcnow() - timedelta(days=days)).date()
+        
+        trends = db.session.query(Job.day_found, Job.platform, func.count(Job.id))\
+                           .filter(Job.day_found >= since)\
+                           .group_by(Job.day_found, Job.platform)\
+                           .order_by(Job.day_found.desc(), Job.platform).all()
         
         return [
             {
-                'date': trend[0].strftime('%Y-%m-%d') if trend[0] else None,
-                'count': trend[1],
-                'platform': trend[2]
+                'date': day.strftime('%Y-%m-%d') if day else None,
+                'count': count,
+                'platform': platform
             }
-            for trend in trends
+            for day, platform, count in trends
         ]
+    
+    @staticmethod
+    def backfill_job_buckets(batch_size=1000):
+        """Renseigne day_found/hour_found des offres insérées avant l'ajout des colonnes, par lots"""
+        def fill_batch(size):
+            try:
+                job_ids = db.session.query(Job.id).filter(Job.day_found.is_(None))\
+                                    .order_by(Job.id).limit(size).scalar_subquery()
+                updated = Job.query.filter(Job.id.in_(job_ids)).update({
+                    Job.day_found: _day(Job.date_found),
+                    Job.hour_found: _hour_expr(Job.date_found)
+                }, synchronize_session=False)
+                db.session.commit()
+                invalidate_responses()
+                return updated
+            except Exception as e:
+                db.session.rollback()
+                raise e
+        
+        return DatabaseUtils.run_in_batches(fill_batch, batch_size)
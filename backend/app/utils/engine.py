@@ -0,0 +1,238 @@
+"""
+Configuration du moteur de base de données (profil SQLite, pools de connexions,
+file d'écriture unique)
+"""
+import contextvars
+import logging
+import queue
+import threading
+from concurrent.futures import Future
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+from app.models import db
+
+logger = logging.getLogger(__name__)
+
+# Clé du bind dédié aux écritures des scrapers
+SCRAPER_BIND = 'scraper'
+
+
+def is_sqlite_uri(uri: str) -> bool:
+    """Indique si l'URI pointe vers une base SQLite"""
+    return (uri or '').startswith('sqlite')
+
+
+def is_memory_sqlite_uri(uri: str) -> bool:
+    """Indique si l'URI pointe vers une base SQLite en mémoire"""
+    return is_sqlite_uri(uri) and (uri.endswith(':memory:') or uri.rstrip('/') == 'sqlite:')
+
+
+def sqlite_pragmas(config) -> list:
+    """Construit la liste des PRAGMA à appliquer à chaque connexion SQLite"""
+    pragmas = [
+        ('journal_mode', config.get('SQLITE_JOURNAL_MODE', 'WAL')),
+        ('synchronous', config.get('SQLITE_SYNCHRONOUS', 'NORMAL')),
+        ('busy_timeout', int(config.get('SQLITE_BUSY_TIMEOUT_MS', 5000))),
+        # Valeur négative = taille en KiB plutôt qu'en nombre de pages
+        ('cache_size', -abs(int(config.get('SQLITE_CACHE_SIZE_KIB', 20000)))),
+        ('mmap_size', int(config.get('SQLITE_MMAP_SIZE', 268435456))),
+        ('temp_store', 'MEMORY'),
+        # Nécessaire pour que les ON DELETE CASCADE soient appliqués
+        ('foreign_keys', 'ON' if config.get('SQLITE_FOREIGN_KEYS', True) else 'OFF'),
+    ]
+    return pragmas
+
+
+def apply_sqlite_pragmas(engine, config):
+    """Enregistre un listener qui applique le profil SQLite sur chaque nouvelle connexion"""
+    pragmas = sqlite_pragmas(config)
+
+    @event.listens_for(engine, 'connect')
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas:
+                cursor.execute(f'PRAGMA {name}={value}')
+        finally:
+            cursor.close()
+
+    logger.info(f"🗄️ SQLite profile enabled: {', '.join(f'{n}={v}' for n, v in pragmas)}")
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool qui compte les threads en attente d'une connexion"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._waiting = 0
+        self._waiting_lock = threading.Lock()
+
+    def _do_get(self):
+        with self._waiting_lock:
+            self._waiting += 1
+        try:
+            return super()._do_get()
+        finally:
+            with self._waiting_lock:
+                self._waiting -= 1
+
+    def waiting(self) -> int:
+        """Nombre de threads actuellement en attente d'une connexion"""
+        return self._waiting
+
+
+def _pool_options(config, uri: str, pool_size: int, max_overflow: int, statement_timeout_ms: int) -> dict:
+    """Construit les options create_engine() d'un pool de connexions"""
+    options = {
+        'poolclass': InstrumentedQueuePool,
+        'pool_size': pool_size,
+        'max_overflow': max_overflow,
+        'pool_timeout': int(config.get('DB_POOL_TIMEOUT', 30)),
+        'pool_recycle': int(config.get('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': bool(config.get('DB_POOL_PRE_PING', True)),
+    }
+    if statement_timeout_ms and uri.startswith('postgresql'):
+        options['connect_args'] = {'options': f'-c statement_timeout={int(statement_timeout_ms)}'}
+    return options
+
+
+def configure_engine_options(app):
+    """
+    Construit les options du moteur et le bind des scrapers à partir de la configuration
+    (à appeler avant db.init_app). Sans effet pour SQLite, qui utilise les pools par défaut.
+    """
+    config = app.config
+    uri = config.get('SQLALCHEMY_DATABASE_URI')
+    if not uri or is_sqlite_uri(uri):
+        return
+
+    # Pool principal : lectures et écritures de l'API
+    options = _pool_options(
+        config, uri,
+        pool_size=int(config.get('DB_POOL_SIZE', 10)),
+        max_overflow=int(config.get('DB_MAX_OVERFLOW', 5)),
+        statement_timeout_ms=config.get('DB_STATEMENT_TIMEOUT_MS'),
+    )
+    options.update(config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+    # Pool séparé pour les scrapers : une rafale de recherches n'affame plus l'API
+    if config.get('DB_SCRAPER_POOL_ENABLED', True):
+        binds = dict(config.get('SQLALCHEMY_BINDS') or {})
+        binds.setdefault(SCRAPER_BIND, {
+            'url': uri,
+            **_pool_options(
+                config, uri,
+                pool_size=int(config.get('DB_SCRAPER_POOL_SIZE', 3)),
+                max_overflow=int(config.get('DB_SCRAPER_MAX_OVERFLOW', 2)),
+                statement_timeout_ms=config.get('DB_SCRAPER_STATEMENT_TIMEOUT_MS'),
+            ),
+        })
+        config['SQLALCHEMY_BINDS'] = binds
+
+
+def use_bind(bind_key: str) -> bool:
+    """Route la session courante vers le moteur du bind donné s'il est configuré"""
+    if bind_key not in db.engines:
+        return False
+    db.session.info['bind_key'] = bind_key
+    return True
+
+
+def pool_stats(engine) -> dict:
+    """Retourne l'utilisation du pool de connexions d'un moteur"""
+    pool = engine.pool
+    stats = {'pool': type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update({
+            'size': pool.size(),
+            'checked_in': pool.checkedin(),
+            'checked_out': pool.checkedout(),
+            'overflow': max(pool.overflow(), 0),
+            'waiting': pool.waiting() if isinstance(pool, InstrumentedQueuePool) else None,
+        })
+    return stats
+
+
+def get_pool_stats() -> dict:
+    """Retourne l'utilisation de tous les pools de l'application (par bind)"""
+    return {
+        key or 'default': pool_stats(engine)
+        for key, engine in db.engines.items()
+    }
+
+
+def init_engine(app):
+    """Configure le moteur de l'application (à appeler après db.init_app)"""
+    with app.app_context():
+        engine = db.engine
+        if engine.dialect.name == 'sqlite' and app.config.get('SQLITE_PRAGMAS_ENABLED', True):
+            apply_sqlite_pragmas(engine, app.config)
+    return engine
+
+
+class WriteQueue:
+    """
+    File d'écriture unique : exécute les transactions d'écriture sur un thread dédié
+    pour que les threads de scraping ne se disputent jamais le verrou d'écriture SQLite.
+    """
+
+    def __init__(self, app=None, name: str = 'jobhub-writer'):
+        self.app = app
+        self.name = name
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._worker, name=self.name, daemon=True)
+                self._thread.start()
+
+    def submit(self, func, *args, **kwargs) -> Future:
+        """Ajoute une écriture à la file et retourne un Future"""
+        future = Future()
+        self._ensure_started()
+        # Le contexte de l'appelant suit l'écriture (rattachement des requêtes au profilage)
+        self._queue.put((future, contextvars.copy_context(), func, args, kwargs))
+        return future
+
+    def run(self, func, *args, **kwargs):
+        """Exécute une écriture via la file et attend son résultat"""
+        if threading.current_thread() is self._thread:
+            # Appel réentrant depuis le thread d'écriture lui-même
+            return func(*args, **kwargs)
+        return self.submit(func, *args, **kwargs).result()
+
+    def stop(self, timeout: float = 5):
+        """Arrête le thread d'écriture après avoir vidé la file"""
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread and thread.is_alive():
+            self._queue.put(None)
+            thread.join(timeout)
+
+    def _call(self, func, args, kwargs):
+        if self.app is not None:
+            with self.app.app_context():
+                return func(*args, **kwargs)
+        return func(*args, **kwargs)
+
+    def _worker(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+
+            future, context, func, args, kwargs = item
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            try:
+                result = context.run(self._call, func, args, kwargs)
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
@@ -0,0 +1,119 @@
+"""
+Diffusion en temps réel des nouvelles offres (Server-Sent Events) : publication après commit
+par le service de scraping, tampon circulaire pour la reprise depuis Last-Event-ID
+"""
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from app.utils.serialization import dumps
+
+
+class JobEventBroker:
+    """
+    Publie les offres enregistrées vers les abonnés du processus.
+    L'id d'événement est l'id de l'offre : il reste valable après un redémarrage. Un événement
+    décrit l'offre à son insertion (is_new vrai) ; les changements d'état ultérieurs passent
+    par GET /api/jobs/changes. Les offres
+    doivent être insérées, commitées et publiées dans ordered_commit() pour que les ids
+    publiés soient croissants.
+    """
+
+    def __init__(self, buffer_size: int = 1000):
+        self._events = deque(maxlen=buffer_size)
+        self._condition = threading.Condition()
+        self._commit_lock = threading.Lock()
+
+    def init_app(self, app):
+        """Configure la taille du tampon à partir de JOB_STREAM_BUFFER_SIZE"""
+        with self._condition:
+            self._events = deque(self._events, maxlen=int(app.config.get('JOB_STREAM_BUFFER_SIZE', 1000)))
+        app.extensions['job_events'] = self
+
+    @contextmanager
+    def ordered_commit(self):
+        """
+        Sérialise, dans le processus, l'insertion (ids attribués au flush), le commit et la
+        publication des offres : sans cela, deux écritures concurrentes peuvent publier leurs
+        ids dans le désordre et un abonné déjà parvenu à l'id N ne recevrait jamais les offres
+        d'id inférieur commitées après lui
+        """
+        with self._commit_lock:
+            yield
+
+    def publish(self, jobs: list):
+        """Publie des offres (dictionnaires sérialisables) déjà commitées"""
+        if not jobs:
+            return
+        with self._condition:
+            for job in jobs:
+                self._events.append((job['id'], job))
+            self._condition.notify_all()
+
+    def oldest_id(self):
+        """Id de la plus ancienne offre encore dans le tampon (None s'il est vide)"""
+        with self._condition:
+            return self._events[0][0] if self._events else None
+
+    def latest_id(self) -> int:
+        """Id de la dernière offre publiée (0 si aucune)"""
+        with self._condition:
+            return self._events[-1][0] if self._events else 0
+
+    def events_after(self, last_id: int) -> list:
+        """Offres du tampon publiées après last_id"""
+        with self._condition:
+            return [job for job_id, job in self._events if job_id > last_id]
+
+    def wait(self, last_id: int, timeout: float) -> list:
+        """Attend des offres postérieures à last_id (liste vide après timeout)"""
+        with self._condition:
+            self._condition.wait_for(
+                lambda: self._events and self._events[-1][0] > last_id, timeout=timeout
+            )
+            return [job for job_id, job in self._events if job_id > last_id]
+
+
+job_events = JobEventBroker()
+
+
+def format_event(job: dict) -> bytes:
+    """Formate une offre en événement SSE"""
+    return b'id: %d\nevent: job\ndata: %s\n\n' % (job['id'], dumps(job))
+
+
+def event_stream(broker: JobEventBroker, last_id: int, matches, replay=None, replay_batch: int = 1000,
+                 heartbeat: float = 15, max_seconds: float = 300):
+    """
+    Générateur SSE : rejoue le retard, puis pousse les nouvelles offres filtrées.
+    replay(after_id, before_id, limit) relit en base, par lots, les offres antérieures au
+    tampon (before_id : plus ancien id du tampon, None s'il est vide) jusqu'à le rejoindre.
+    Le flux se termine après max_seconds ; EventSource se reconnecte avec Last-Event-ID.
+    """
+    yield b'retry: 5000\n\n'
+
+    while replay is not None:
+        oldest = broker.oldest_id()
+        if oldest is not None and oldest <= last_id + 1:
+            break  # Le tampon prend le relais sans trou
+        jobs = replay(last_id, oldest, replay_batch)
+        for job in jobs:
+            last_id = max(last_id, job['id'])
+            if matches(job):
+                yield format_event(job)
+        if len(jobs) < replay_batch:
+            if oldest is None:
+                break
+            # Tout ce qui précède le tampon est rejoué ; on vérifie qu'il n'a pas avancé entre-temps
+            last_id = max(last_id, oldest - 1)
+
+    deadline = time.monotonic() + max_seconds
+    while time.monotonic() < deadline:
+        jobs = broker.wait(last_id, timeout=min(heartbeat, max(deadline - time.monotonic(), 0)))
+        if not jobs:
+            yield b': keep-alive\n\n'
+            continue
+        for job in jobs:
+            last_id = max(last_id, job['id'])
+            if matches(job):
+                yield format_event(job)
@@ -0,0 +1,119 @@
+"""
+Export en flux des offres (NDJSON, CSV, Parquet) : curseur côté serveur et lecture par blocs,
+mémoire constante quel que soit le nombre de lignes
+"""
+import csv
+import io
+from app.utils.serialization import JOB_FIELDS, dumps
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # Export Parquet optionnel
+    pyarrow = None
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+
+def stream_chunks(engine, statement, chunk_size: int = 5000):
+    """Exécute la requête sur une connexion dédiée et produit les lignes par blocs"""
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=chunk_size).execute(statement)
+        for partition in result.partitions(chunk_size):
+            yield partition
+
+
+def ndjson_stream(chunks, fields=JOB_FIELDS):
+    """Une offre JSON par ligne"""
+    for rows in chunks:
+        yield b''.join(dumps(dict(zip(fields, row))) + b'\n' for row in rows)
+
+
+def csv_stream(chunks, fields=JOB_FIELDS):
+    """CSV avec en-tête, dates au format ISO 8601"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+
+    for rows in chunks:
+        writer.writerows(
+            [value.isoformat() if hasattr(value, 'isoformat') else value for value in row]
+            for row in rows
+        )
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+class _ChunkSink(io.RawIOBase):
+    """Fichier en écriture seule dont le contenu est vidé après chaque bloc"""
+
+    def __init__(self):
+        self._parts = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b''.join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def _parquet_schema():
+    return pyarrow.schema([
+        ('id', pyarrow.int64()), ('search_id', pyarrow.int64()), ('title', pyarrow.string()),
+        ('company', pyarrow.string()), ('url', pyarrow.string()), ('platform', pyarrow.string()),
+        ('location', pyarrow.string()), ('description_snippet', pyarrow.string()),
+        ('salary_info', pyarrow.string()), ('job_type', pyarrow.string()),
+        ('date_posted', pyarrow.timestamp('us')), ('date_found', pyarrow.timestamp('us')),
+        ('is_new', pyarrow.bool_()),
+    ])
+
+
+def parquet_stream(chunks, fields=JOB_FIELDS):
+    """Parquet avec un row group par bloc, envoyé dès qu'il est écrit"""
+    if pyarrow is None:
+        raise RuntimeError('Parquet export requires pyarrow (pip install pyarrow)')
+
+    schema = _parquet_schema()
+    sink = _ChunkSink()
+    writer = pyarrow.parquet.ParquetWriter(sink, schema, compression='zstd')
+
+    for rows in chunks:
+        columns = list(zip(*rows))
+        writer.write_table(pyarrow.Table.from_arrays(
+            [pyarrow.array(column, type=schema.field(name).type) for name, column in zip(fields, columns)],
+            schema=schema
+        ))
+        yield sink.drain()
+
+    writer.close()
+    yield sink.drain()
+
+
+def export_stream(export_format: str, chunks):
+    """Sélectionne le générateur correspondant au format demandé"""
+    streams = {'ndjson': ndjson_stream, 'csv': csv_stream, 'parquet': parquet_stream}
+    return streams[export_format](chunks)
+
+
+def parquet_available() -> bool:
+    """Indique si l'export Parquet est disponible"""
+    return pyarrow is not None
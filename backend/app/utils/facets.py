@@ -0,0 +1,119 @@
+"""
+Comptes par facette (plateforme, type de contrat, entreprise, localisation) sur l'ensemble
+filtré d'une recherche, en une seule requête : GROUPING SETS sur PostgreSQL, UNION ALL de
+GROUP BY plafonnés ailleurs (SQLite)
+"""
+from sqlalchemy import func, literal, select, tuple_, union_all
+from app.models import db, Job
+
+FACET_COLUMNS = {
+    'platform': Job.platform,
+    'job_type': Job.job_type,
+    'company': Job.company,
+    'location': Job.location,
+}
+
+
+def parse_facets(requested) -> list:
+    """
+    Facettes demandées : True pour toutes, ou liste de noms
+
+    Raises:
+        ValueError: facette inconnue ou type invalide
+    """
+    if requested is True:
+        return list(FACET_COLUMNS)
+    if requested is None or requested is False:
+        return []
+    if isinstance(requested, str):
+        requested = [requested]
+    if not isinstance(requested, list) or not all(isinstance(name, str) for name in requested):
+        raise ValueError('facets must be true, a facet name or a list of facet names')
+    unknown = [name for name in requested if name not in FACET_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown facets: {', '.join(map(str, unknown))} (available: {', '.join(FACET_COLUMNS)})")
+    return list(dict.fromkeys(requested))
+
+
+def _format(counts, limit: int) -> dict:
+    """Valeurs les plus fréquentes d'une facette (valeurs vides ignorées)"""
+    ranked = sorted(
+        ((value, count) for value, count in counts if value not in (None, '')),
+        key=lambda item: (-item[1], item[0])
+    )
+    return {
+        'values': [{'value': value, 'count': count} for value, count in ranked[:limit]],
+        'truncated': len(ranked) > limit
+    }
+
+
+def _grouping_sets_counts(query, names: list, limit: int) -> dict:
+    """PostgreSQL : une requête GROUPING SETS, plafonnée par facette avec row_number()"""
+    columns = [FACET_COLUMNS[name] for name in names]
+    count = func.count().label('count')
+    # GROUPING(col) = 0 pour les lignes de l'ensemble de cette colonne
+    flags = [func.grouping(column).label(f'g_{name}') for name, column in zip(names, columns)]
+    # Égalités départagées par la valeur, comme _format : mêmes valeurs retenues à chaque appel
+    rank = func.row_number().over(
+        partition_by=[func.grouping(column) for column in columns],
+        order_by=[func.count().desc(), *columns]
+    ).label('rank')
+
+    grouped = query.order_by(None)\
+        .with_entities(*[column.label(name) for name, column in zip(names, columns)], count, *flags, rank)\
+        .group_by(func.grouping_sets(*[tuple_(column) for column in columns]))\
+        .subquery('facet_counts')
+
+    # Marge pour les groupes NULL et '' (ignorés) et une valeur de plus pour savoir si la facette est tronquée
+    rows = db.session.query(grouped).filter(grouped.c.rank <= limit + 3).all()
+
+    counts = {name: [] for name in names}
+    for row in rows:
+        for name in names:
+            if getattr(row, f'g_{name}') == 0:
+                counts[name].append((getattr(row, name), row.count))
+                break
+    return {name: _format(counts[name], limit) for name in names}
+
+
+def _union_counts(query, names: list, limit: int) -> dict:
+    """Autres moteurs : un GROUP BY plafonné par facette, réunis par UNION ALL en une requête"""
+    branches = []
+    for name in names:
+        column = FACET_COLUMNS[name]
+        count = func.count().label('count')
+        # Une valeur de plus que la limite pour savoir si la facette est tronquée
+        top = query.order_by(None)\
+            .filter(column.isnot(None), column != '')\
+            .with_entities(literal(name).label('facet'), column.label('value'), count)\
+            .group_by(column)\
+            .order_by(count.desc(), column)\
+            .limit(limit + 1)\
+            .subquery(f'facet_{name}')
+        branches.append(select(top.c.facet, top.c.value, top.c.count))
+
+    rows = db.session.execute(union_all(*branches)).all()
+
+    counts = {name: [] for name in names}
+    for facet, value, count in rows:
+        counts[facet].append((value, count))
+    return {name: _format(counts[name], limit) for name in names}
+
+
+def facet_counts(query, names: list, limit: int = 10) -> dict:
+    """
+    Comptes par facette sur une requête Job filtrée
+
+    Args:
+        query: Requête Job filtrée (avant sélection des colonnes et tri)
+        names: Facettes à calculer (voir FACET_COLUMNS)
+        limit: Nombre maximum de valeurs par facette
+
+    Returns:
+        {facette: {'values': [{'value', 'count'}], 'truncated': bool}}
+    """
+    if not names:
+        return {}
+    if db.engine.dialect.name == 'postgresql':
+        return _grouping_sets_counts(query, names, limit)
+    return _union_counts(query, names, limit)
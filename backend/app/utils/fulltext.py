@@ -0,0 +1,129 @@
+"""
+Index plein texte des offres : FTS5 sur SQLite, tsvector/GIN sur PostgreSQL
+"""
+import logging
+import re
+from sqlalchemy import func, literal_column
+from app.models import db, Job
+
+logger = logging.getLogger(__name__)
+
+# Moteurs pour lesquels l'index plein texte est en place
+_available_engines = set()
+
+# Suffixes français retirés des termes de recherche avant la recherche par préfixe
+# (FTS5 n'a pas de stemmer français : "développeuses" devient "développ*")
+_FRENCH_SUFFIXES = (
+    'issements', 'issement', 'ements', 'ement', 'ations', 'ation', 'atrices', 'atrice',
+    'ateurs', 'ateur', 'euses', 'euse', 'eurs', 'eur', 'ives', 'ive', 'ifs', 'if',
+    'ences', 'ence', 'ances', 'ance', 'iques', 'ique', 'es', 's', 'x', 'e',
+)
+
+_SQLITE_SETUP = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS jobs_fts USING fts5(
+        title, company, description_snippet,
+        content='jobs', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3 4'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS jobs_fts_ai AFTER INSERT ON jobs BEGIN
+        INSERT INTO jobs_fts(rowid, title, company, description_snippet)
+        VALUES (new.id, new.title, new.company, new.description_snippet);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS jobs_fts_ad AFTER DELETE ON jobs BEGIN
+        INSERT INTO jobs_fts(jobs_fts, rowid, title, company, description_snippet)
+        VALUES ('delete', old.id, old.title, old.company, old.description_snippet);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS jobs_fts_au AFTER UPDATE OF title, company, description_snippet ON jobs BEGIN
+        INSERT INTO jobs_fts(jobs_fts, rowid, title, company, description_snippet)
+        VALUES ('delete', old.id, old.title, old.company, old.description_snippet);
+        INSERT INTO jobs_fts(rowid, title, company, description_snippet)
+        VALUES (new.id, new.title, new.company, new.description_snippet);
+    END""",
+]
+
+_POSTGRES_DOCUMENT = (
+    "coalesce(title, '') || ' ' || coalesce(company, '') || ' ' || coalesce(description_snippet, '')"
+)
+
+_POSTGRES_SETUP = [
+    f"""CREATE INDEX IF NOT EXISTS ix_jobs_fulltext ON jobs
+        USING GIN (to_tsvector('french'::regconfig, {_POSTGRES_DOCUMENT}))""",
+]
+
+
+def _search_terms(query_text: str) -> list:
+    """Découpe la saisie utilisateur en termes sûrs pour le moteur plein texte"""
+    return [term for term in re.findall(r'\w+', query_text.lower()) if term]
+
+
+def _light_french_stem(term: str) -> str:
+    """Retire un suffixe flexionnel courant en gardant au moins 4 caractères"""
+    for suffix in _FRENCH_SUFFIXES:
+        if term.endswith(suffix) and len(term) - len(suffix) >= 4:
+            return term[:-len(suffix)]
+    return term
+
+
+def setup_fulltext(engine) -> bool:
+    """Crée l'index plein texte et ses triggers de maintenance s'ils n'existent pas"""
+    dialect = engine.dialect.name
+
+    try:
+        with engine.begin() as conn:
+            if dialect == 'sqlite':
+                triggers = conn.exec_driver_sql(
+                    "SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'jobs_fts_%'"
+                ).scalar()
+                for statement in _SQLITE_SETUP:
+                    conn.exec_driver_sql(statement)
+                if triggers < 3:
+                    # Index neuf ou table jobs recréée : réindexer les offres existantes
+                    conn.exec_driver_sql("INSERT INTO jobs_fts(jobs_fts) VALUES ('rebuild')")
+                    logger.info("🔎 Full-text index (FTS5) built")
+            elif dialect == 'postgresql':
+                for statement in _POSTGRES_SETUP:
+                    conn.exec_driver_sql(statement)
+            else:
+                return False
+    except Exception as e:
+        logger.warning(f"⚠️ Full-text search not available ({dialect}): {e}")
+        _available_engines.discard(engine)
+        return False
+
+    _available_engines.add(engine)
+    return True
+
+
+def fulltext_available() -> bool:
+    """Indique si l'index plein texte est utilisable sur le moteur courant"""
+    return db.engine in _available_engines
+
+
+def apply_fulltext_search(query, query_text: str):
+    """
+    Filtre une requête Job avec l'index plein texte (préfixes + stemming français)
+
+    Returns:
+        Tuple (requête filtrée, expression de rang à trier par ordre croissant),
+        ou None si l'index n'est pas disponible ou si la saisie est vide
+    """
+    terms = _search_terms(query_text)
+    if not terms or not fulltext_available():
+        return None
+
+    stems = [_light_french_stem(term) for term in terms]
+
+    if db.engine.dialect.name == 'sqlite':
+        match = ' '.join(f'"{stem}"*' for stem in stems)
+        fts = db.text(
+            "SELECT rowid AS job_id, bm25(jobs_fts, 10.0, 5.0, 1.0) AS rank "
+            "FROM jobs_fts WHERE jobs_fts MATCH :match"
+        ).bindparams(match=match).columns(job_id=db.Integer, rank=db.Float).subquery('fts')
+        return query.join(fts, fts.c.job_id == Job.id), fts.c.rank
+
+    # PostgreSQL : même expression que l'index GIN pour qu'il soit utilisé
+    config = literal_column("'french'::regconfig")
+    vector = func.to_tsvector(config, literal_column(_POSTGRES_DOCUMENT))
+    tsquery = func.to_tsquery(config, ' & '.join(f'{term}:*' for term in terms))
+    return query.filter(vector.op('@@')(tsquery)), -func.ts_rank(vector, tsquery)
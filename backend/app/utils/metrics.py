@@ -0,0 +1,261 @@
+"""
+Registre de métriques en mémoire (compteurs, jauges, histogrammes) et exposition au format
+texte Prometheus. Mis à jour par les scrapers et le service de scraping ; une collecte ne
+touche jamais la base de données. Chaque processus expose ses propres valeurs.
+"""
+import bisect
+import threading
+from abc import ABC, abstractmethod
+import time
+from contextlib import contextmanager
+
+# Latences HTTP et durées de traitement, en secondes
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{value}"' for name, value in extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric(ABC):
+    """Base commune : nom, aide, étiquettes et séries par combinaison d'étiquettes"""
+
+    type_name = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f'{self.name} expects labels {self.labelnames}, got {tuple(labels)}')
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    @abstractmethod
+    def samples(self):
+        """Lignes (suffixe, valeurs d'étiquettes, étiquettes supplémentaires, valeur)"""
+
+    def render(self) -> str:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.type_name}']
+        for suffix, values, extra, value in self.samples():
+            lines.append(f'{self.name}{suffix}{_format_labels(self.labelnames, values, extra)} {_format_value(value)}')
+        return '\n'.join(lines)
+
+
+class Counter(_Metric):
+    """Valeur croissante (requêtes, erreurs, offres enregistrées)"""
+
+    type_name = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        if amount < 0:
+            raise ValueError('Counters can only increase')
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._series.get(self._key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            series = sorted(self._series.items())
+        return [('_total' if not self.name.endswith('_total') else '', key, (), value) for key, value in series]
+
+
+class Gauge(_Metric):
+    """Valeur instantanée (exécutions en cours, utilisation des pools)"""
+
+    type_name = 'gauge'
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels):
+        return self._series.get(self._key(labels), 0)
+
+    @contextmanager
+    def track_in_progress(self, **labels):
+        """Incrémente la jauge pendant l'exécution du bloc"""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+    def samples(self):
+        with self._lock:
+            series = sorted(self._series.items())
+        return [('', key, (), value) for key, value in series]
+
+
+class Histogram(_Metric):
+    """Distribution de durées, par intervalles cumulés"""
+
+    type_name = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # Comptes par intervalle (le dernier pour +Inf), somme
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Mesure la durée du bloc"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        series = self._series.get(self._key(labels))
+        return sum(series[0]) if series else 0
+
+    def samples(self):
+        with self._lock:
+            series = sorted((key, (list(counts), total)) for key, (counts, total) in self._series.items())
+
+        samples = []
+        for key, (counts, total) in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                samples.append(('_bucket', key, (('le', _format_value(float(bound))),), cumulative))
+            samples.append(('_count', key, (), cumulative))
+            samples.append(('_sum', key, (), total))
+        return samples
+
+
+class MetricsRegistry:
+    """Ensemble des métriques exposées par le processus"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                    raise ValueError(f'Metric {metric.name} already registered with another definition')
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames=()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames=()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """Exposition au format texte Prometheus 0.0.4"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return '\n'.join(metric.render() for metric in metrics) + '\n'
+
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+metrics = MetricsRegistry()
+
+# Scrapers (BaseScraper)
+SCRAPER_REQUESTS = metrics.counter(
+    'jobhub_scraper_requests_total', 'HTTP requests sent by scrapers, by response status',
+    ('platform', 'status'))
+SCRAPER_REQUEST_DURATION = metrics.histogram(
+    'jobhub_scraper_request_duration_seconds', 'HTTP request latency of scrapers (anti-detection delay excluded)',
+    ('platform',))
+SCRAPER_RETRIES = metrics.counter(
+    'jobhub_scraper_retries_total', 'Scraper request retries, by reason (rate_limited, error)',
+    ('platform', 'reason'))
+SCRAPER_PARSE_DURATION = metrics.histogram(
+    'jobhub_scraper_parse_duration_seconds', 'HTML parsing time per result page',
+    ('platform',))
+SCRAPE_DURATION = metrics.histogram(
+    'jobhub_scrape_duration_seconds', 'Duration of a full scrape_jobs call',
+    ('platform', 'status'), buckets=(1, 5, 10, 30, 60, 120, 300, 600, 1200))
+SCRAPE_JOBS_FOUND = metrics.counter(
+    'jobhub_scrape_jobs_found_total', 'Job listings returned by scrapers',
+    ('platform',))
+
+# Service de scraping
+SEARCH_EXECUTIONS = metrics.counter(
+    'jobhub_search_executions_total', 'Scheduled or manual search executions, by outcome',
+    ('status',))
+SEARCH_EXECUTION_DURATION = metrics.histogram(
+    'jobhub_search_execution_duration_seconds', 'Duration of a search execution across all platforms',
+    buckets=(1, 5, 10, 30, 60, 120, 300, 600, 1200, 1800))
+SEARCHES_IN_PROGRESS = metrics.gauge(
+    'jobhub_searches_in_progress', 'Search executions currently running')
+JOBS_SAVED = metrics.counter(
+    'jobhub_jobs_saved_total', 'New jobs saved to the database',
+    ('platform',))
+JOBS_DUPLICATE = metrics.counter(
+    'jobhub_jobs_duplicate_total', 'Scraped jobs skipped because their URL is already stored',
+    ('platform',))
+DB_COMMIT_DURATION = metrics.histogram(
+    'jobhub_db_commit_duration_seconds', 'Database write transaction time (flush and commit)',
+    ('operation',))
+
+# Requêtes HTTP et SQL (app/utils/profiling.py)
+HTTP_REQUEST_DURATION = metrics.histogram(
+    'jobhub_http_request_duration_seconds', 'API request latency by endpoint',
+    ('endpoint', 'method', 'status'))
+HTTP_REQUEST_QUERIES = metrics.histogram(
+    'jobhub_http_request_queries', 'SQL statements executed per API request',
+    ('endpoint',), buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 200))
+HTTP_REQUEST_ROWS = metrics.histogram(
+    'jobhub_http_request_rows', 'Rows per API request: fetched by ORM session queries (read) or modified by INSERT/UPDATE/DELETE (written)',
+    ('endpoint', 'kind'), buckets=(0, 1, 10, 50, 100, 500, 1000, 5000, 10000, 50000))
+DB_SLOW_QUERIES = metrics.counter(
+    'jobhub_db_slow_queries_total', 'SQL statements slower than SLOW_QUERY_MS, by endpoint or execution',
+    ('scope',))
+DB_N_PLUS_ONE = metrics.counter(
+    'jobhub_db_n_plus_one_total', 'Statement shapes repeated at least N_PLUS_ONE_THRESHOLD times in one scope',
+    ('scope',))
+
+# Pools de connexions (relevés à chaque collecte, sans requête)
+DB_POOL_CONNECTIONS = metrics.gauge(
+    'jobhub_db_pool_connections', 'Connection pool usage by bind and state',
+    ('bind', 'state'))
@@ -0,0 +1,165 @@
+"""
+Mises à jour de schéma idempotentes pour les bases déjà créées
+(db.create_all() ne crée que les tables manquantes, pas leurs nouvelles colonnes ni leurs index)
+"""
+import logging
+from flask import current_app
+from sqlalchemy import MetaData, inspect, select, update, insert, func, and_
+from sqlalchemy.schema import CreateColumn, CreateTable
+from app.models import db, Search, Job, JobCounter, JobSeenOverride, JobMetrics, ExecutionLog
+from app.utils.database import DatabaseUtils
+from app.utils.fulltext import setup_fulltext
+
+logger = logging.getLogger(__name__)
+
+
+def add_missing_columns(engine, metadata) -> list:
+    """Ajoute les colonnes déclarées dans les modèles qui n'existent pas encore en base"""
+    inspector = inspect(engine)
+    added = []
+
+    for table in metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            ddl = CreateColumn(column).compile(dialect=engine.dialect)
+            with engine.begin() as conn:
+                conn.exec_driver_sql(f'ALTER TABLE {table.name} ADD COLUMN {ddl}')
+            added.append(f'{table.name}.{column.name}')
+
+    return added
+
+
+def create_missing_indexes(engine, metadata) -> list:
+    """Crée les index déclarés dans les modèles qui n'existent pas encore en base"""
+    inspector = inspect(engine)
+    created = []
+
+    for table in metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(engine)
+                created.append(index.name)
+
+    return created
+
+
+def backfill_seen_watermarks(engine):
+    """
+    Convertit l'ancienne colonne jobs.is_new en filigranes par recherche : le filigrane est
+    la dernière offre vue, les offres plus anciennes encore nouvelles deviennent des états forcés
+    """
+    searches, jobs = Search.__table__, Job.__table__
+    last_seen = select(func.max(jobs.c.id))\
+        .where(jobs.c.search_id == searches.c.id, jobs.c.is_new == False)\
+        .scalar_subquery()
+
+    with engine.begin() as conn:
+        conn.execute(update(searches).values(seen_until_id=func.coalesce(last_seen, 0)))
+        still_new = select(jobs.c.id, jobs.c.search_id, jobs.c.is_new)\
+            .join(searches, searches.c.id == jobs.c.search_id)\
+            .where(and_(jobs.c.is_new == True, jobs.c.id <= searches.c.seen_until_id))
+        conn.execute(insert(JobSeenOverride.__table__).from_select(['job_id', 'search_id', 'is_new'], still_new))
+
+
+def rebuild_autoincrement_tables(engine, metadata) -> list:
+    """
+    SQLite : recrée avec AUTOINCREMENT les tables qui le déclarent (sqlite_autoincrement) mais ont
+    été créées sans, pour que leurs ids ne soient plus réutilisés. Les lignes sont recopiées avec
+    leurs ids ; la séquence reprend après le plus grand.
+    """
+    if engine.dialect.name != 'sqlite':
+        return []
+
+    inspector = inspect(engine)
+    rebuilt = []
+
+    for table in metadata.sorted_tables:
+        if not table.dialect_options['sqlite'].get('autoincrement') or not inspector.has_table(table.name):
+            continue
+
+        with engine.begin() as conn:
+            ddl = conn.exec_driver_sql(
+                "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table.name,)
+            ).scalar()
+            if 'AUTOINCREMENT' in ddl.upper():
+                continue
+
+            new_table = table.to_metadata(MetaData(), name=f'{table.name}_rebuild')
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            columns = ', '.join(column.name for column in table.columns if column.name in existing)
+
+            conn.exec_driver_sql(f'DROP TABLE IF EXISTS {new_table.name}')
+            conn.execute(CreateTable(new_table))
+            # L'INSERT ouvre la transaction : copie, remplacement et index sont atomiques
+            conn.exec_driver_sql(f'INSERT INTO {new_table.name} ({columns}) SELECT {columns} FROM {table.name}')
+            conn.exec_driver_sql(f'DROP TABLE {table.name}')
+            conn.exec_driver_sql(f'ALTER TABLE {new_table.name} RENAME TO {table.name}')
+            for index in table.indexes:
+                index.create(conn)
+
+        rebuilt.append(f'{table.name} (AUTOINCREMENT)')
+
+    return rebuilt
+
+
+def job_metrics_outdated(engine, applied: list) -> bool:
+    """
+    Indique si le rollup JobMetrics doit être recalculé : colonnes de compteurs ou index unique
+    (date, plateforme) ajoutés par la mise à jour, ou rollup vide alors que des logs existent
+    """
+    if any(name.startswith('job_metrics.') for name in applied):
+        return True
+
+    indexes = {index['name'] for index in inspect(engine).get_indexes(JobMetrics.__tablename__)}
+    if 'ux_job_metrics_date_platform' not in indexes:
+        return True
+
+    return JobMetrics.query.first() is None and ExecutionLog.query.first() is not None
+
+
+def upgrade_schema() -> list:
+    """Applique toutes les mises à jour de schéma (à appeler dans un contexte d'application)"""
+    applied = rebuild_autoincrement_tables(db.engine, db.metadata)
+    applied += add_missing_columns(db.engine, db.metadata)
+    
+    # Rollup des statistiques par plateforme, recalculé depuis les logs avant la création de
+    # son index unique (une ancienne base peut contenir des doublons date/plateforme)
+    rebuild_metrics = job_metrics_outdated(db.engine, applied)
+    if rebuild_metrics:
+        DatabaseUtils.rebuild_job_metrics()
+    
+    applied += create_missing_indexes(db.engine, db.metadata)
+    if rebuild_metrics:
+        applied.append('job_metrics rollup rebuild')
+    
+    # Passage de la colonne is_new au filigrane "vu jusqu'à"
+    if 'searches.seen_until_id' in applied:
+        backfill_seen_watermarks(db.engine)
+        applied.append('seen watermark backfill')
+    
+    if current_app.config.get('FULLTEXT_SEARCH_ENABLED', True):
+        setup_fulltext(db.engine)
+    
+    # Colonnes de regroupement par jour/heure des offres existantes
+    if 'jobs.day_found' in applied:
+        DatabaseUtils.backfill_job_buckets()
+        applied.append('jobs day/hour buckets backfill')
+    
+    # Initialiser les compteurs matérialisés d'une base existante
+    if JobCounter.query.first() is None and Job.query.first() is not None:
+        DatabaseUtils.reconcile_counters()
+        applied.append('job_counters backfill')
+
+    for name in applied:
+        logger.info(f"🔧 Schema upgrade applied: {name}")
+
+    return applied
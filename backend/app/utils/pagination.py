@@ -0,0 +1,107 @@
+"""
+Pagination par curseur (keyset) : le coût d'une page profonde est le même que celui de la première
+"""
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import and_, or_, tuple_
+
+
+class InvalidCursor(ValueError):
+    """Curseur de pagination illisible ou altéré"""
+    pass
+
+
+def encode_cursor(date_value: datetime, row_id: int) -> str:
+    """Encode la position (date, id) de la dernière ligne en curseur opaque"""
+    payload = json.dumps([date_value.isoformat() if date_value else None, row_id])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token: str):
+    """Décode un curseur opaque en tuple (date, id)"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        date_value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(date_value), int(row_id)
+    except (ValueError, TypeError, json.JSONDecodeError) as e:
+        raise InvalidCursor(f'Invalid cursor: {token}') from e
+
+
+def paginate_keyset(query, date_column, id_column, cursor: str = None, limit: int = 50):
+    """
+    Applique une pagination keyset décroissante sur (date_column, id_column)
+
+    Returns:
+        Tuple (éléments de la page, curseur de la page suivante ou None)
+
+    Raises:
+        ValueError: taille de page inférieure à 1
+        InvalidCursor: curseur illisible
+    """
+    if limit < 1:
+        raise ValueError(f'Invalid page size: {limit} (must be at least 1)')
+    if cursor:
+        date_value, row_id = decode_cursor(cursor)
+        query = query.filter(tuple_(date_column, id_column) < tuple_(date_value, row_id))
+
+    items = query.order_by(date_column.desc(), id_column.desc()).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        last = items[-1]
+        next_cursor = encode_cursor(getattr(last, date_column.key), getattr(last, id_column.key))
+
+    return items, next_cursor
+
+
+def encode_rank_cursor(rank: float, date_value: datetime, row_id: int) -> str:
+    """Encode la position (rang, date, id) de la dernière ligne d'un classement par pertinence"""
+    payload = json.dumps([rank, date_value.isoformat() if date_value else None, row_id])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_rank_cursor(token: str):
+    """Décode un curseur de classement en tuple (rang, date, id)"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        rank, date_value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return float(rank), datetime.fromisoformat(date_value), int(row_id)
+    except (ValueError, TypeError, json.JSONDecodeError) as e:
+        raise InvalidCursor(f'Invalid cursor: {token}') from e
+
+
+def paginate_ranked(query, rank, date_column, id_column, cursor: str = None, limit: int = 50):
+    """
+    Applique une pagination keyset sur (rank croissant, date_column et id_column décroissants)
+
+    Le rang est recalculé à chaque page : il doit être déterministe pour une ligne donnée
+    (bm25, ts_rank), les égalités étant départagées par (date, id).
+
+    Returns:
+        Tuple (éléments de la page, curseur de la page suivante ou None)
+
+    Raises:
+        ValueError: taille de page inférieure à 1
+        InvalidCursor: curseur illisible
+    """
+    if limit < 1:
+        raise ValueError(f'Invalid page size: {limit} (must be at least 1)')
+    if cursor:
+        rank_value, date_value, row_id = decode_rank_cursor(cursor)
+        query = query.filter(or_(
+            rank > rank_value,
+            and_(rank == rank_value, tuple_(date_column, id_column) < tuple_(date_value, row_id))
+        ))
+
+    items = query.add_columns(rank.label('rank'))\
+        .order_by(rank, date_column.desc(), id_column.desc()).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        last = items[-1]
+        next_cursor = encode_rank_cursor(last.rank, getattr(last, date_column.key), getattr(last, id_column.key))
+
+    return items, next_cursor
@@ -0,0 +1,192 @@
+"""
+Profilage des requêtes HTTP et SQL : latence et nombre de requêtes par endpoint, journal des
+requêtes lentes rattachées à leur route ou à leur exécution de scraping, détection des N+1
+(même forme de requête répétée dans une même requête HTTP ou exécution)
+"""
+import logging
+import re
+import time
+from collections import Counter as ShapeCounter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from flask import g, request
+from sqlalchemy import event
+from app.models import db
+from app.utils.metrics import (
+    HTTP_REQUEST_DURATION, HTTP_REQUEST_QUERIES, HTTP_REQUEST_ROWS, DB_SLOW_QUERIES, DB_N_PLUS_ONE
+)
+
+logger = logging.getLogger(__name__)
+
+_current_scope = ContextVar('jobhub_profile_scope', default=None)
+
+# Listes IN et littéraux numériques : une même forme, quel que soit le nombre de paramètres
+_IN_LIST = re.compile(r'\((?:\s*(?:\?|%\(\w+\)s|:\w+|\$\d+|__\[POSTCOMPILE_\w+\])\s*,?)+\)')
+_NUMBER = re.compile(r'\b\d+\b')
+
+
+def statement_shape(statement: str) -> str:
+    """Forme normalisée d'une requête SQL, pour regrouper ses répétitions"""
+    shape = _IN_LIST.sub('(?)', statement)
+    shape = _NUMBER.sub('?', shape)
+    return ' '.join(shape.split())
+
+
+class ProfileScope:
+    """Requêtes SQL exécutées pendant une requête HTTP ou une exécution de scraping"""
+
+    def __init__(self, name: str, detail: str = None):
+        self.name = name  # Étiquette des métriques (endpoint, 'search')
+        self.detail = detail or name  # Contexte des logs (chemin, id de recherche)
+        self.started_at = time.perf_counter()
+        self.query_count = 0
+        self.query_time = 0.0
+        # Lignes lues par les requêtes de la session ORM, et lignes modifiées (cursor.rowcount des
+        # INSERT/UPDATE/DELETE : rowcount d'un SELECT vaut -1 sous sqlite3)
+        self.rows_read = 0
+        self.rows_written = 0
+        self.shapes = ShapeCounter()
+
+    def record(self, statement: str, duration: float, rows_written: int):
+        self.query_count += 1
+        self.query_time += duration
+        if rows_written > 0:
+            self.rows_written += rows_written
+        self.shapes[statement_shape(statement)] += 1
+
+    def repeated_shapes(self, threshold: int) -> list:
+        """Formes exécutées au moins `threshold` fois (candidats N+1)"""
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= threshold]
+
+
+def current_scope():
+    return _current_scope.get()
+
+
+class QueryProfiler:
+    """Branche les hooks SQLAlchemy et Flask ; configuré par PROFILING_*"""
+
+    def __init__(self):
+        self.enabled = False
+        self.slow_query_seconds = 0.2
+        self.n_plus_one_threshold = 5
+
+    def init_app(self, app):
+        self.enabled = app.config.get('PROFILING_ENABLED', True)
+        self.slow_query_seconds = app.config.get('SLOW_QUERY_MS', 200) / 1000
+        self.n_plus_one_threshold = int(app.config.get('N_PLUS_ONE_THRESHOLD', 5))
+        app.extensions['query_profiler'] = self
+        if not self.enabled:
+            return
+
+        with app.app_context():
+            for engine in db.engines.values():
+                if not event.contains(engine, 'before_cursor_execute', _before_cursor_execute):
+                    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+                    event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+                    event.listen(engine, 'handle_error', _handle_error)
+            if not event.contains(db.session, 'do_orm_execute', _do_orm_execute):
+                event.listen(db.session, 'do_orm_execute', _do_orm_execute)
+
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get('query_start')
+        if not starts:
+            return
+        duration = time.perf_counter() - starts.pop()
+
+        scope = _current_scope.get()
+        if scope is not None:
+            dml = context is not None and (context.isinsert or context.isupdate or context.isdelete)
+            scope.record(statement, duration, cursor.rowcount if dml else 0)
+
+        if duration >= self.slow_query_seconds:
+            where = scope.detail if scope is not None else 'background'
+            DB_SLOW_QUERIES.inc(scope=scope.name if scope is not None else 'background')
+            logger.warning(f"🐢 Slow query ({duration * 1000:.0f} ms) in {where}: {' '.join(statement.split())[:500]}")
+
+    def open_scope(self, name: str, detail: str = None):
+        scope = ProfileScope(name, detail)
+        return scope, _current_scope.set(scope)
+
+    def close_scope(self, scope, token):
+        _current_scope.reset(token)
+        for shape, count in scope.repeated_shapes(self.n_plus_one_threshold):
+            DB_N_PLUS_ONE.inc(scope=scope.name)
+            logger.warning(f"🔁 Possible N+1 in {scope.detail}: statement executed {count} times: {shape[:300]}")
+
+    def _before_request(self):
+        g.profile_scope, g.profile_token = self.open_scope(
+            request.endpoint or 'unknown', f'{request.method} {request.path}'
+        )
+
+    def _after_request(self, response):
+        scope = g.pop('profile_scope', None)
+        if scope is None:
+            return response
+        self.close_scope(scope, g.pop('profile_token'))
+
+        elapsed = time.perf_counter() - scope.started_at
+        HTTP_REQUEST_DURATION.observe(elapsed, endpoint=scope.name, method=request.method,
+                                      status=response.status_code)
+        HTTP_REQUEST_QUERIES.observe(scope.query_count, endpoint=scope.name)
+        HTTP_REQUEST_ROWS.observe(scope.rows_read, endpoint=scope.name, kind='read')
+        HTTP_REQUEST_ROWS.observe(scope.rows_written, endpoint=scope.name, kind='written')
+
+        response.headers['X-Query-Count'] = str(scope.query_count)
+        response.headers['X-Query-Rows'] = str(scope.rows_read)
+        response.headers['X-Query-Rows-Written'] = str(scope.rows_written)
+        response.headers['Server-Timing'] = (
+            f'app;dur={elapsed * 1000:.1f}, db;dur={scope.query_time * 1000:.1f};desc="{scope.query_count} queries"'
+        )
+        return response
+
+    def _teardown_request(self, exc):
+        # Requête interrompue par une exception : after_request n'a pas été appelé
+        scope = g.pop('profile_scope', None)
+        if scope is not None:
+            self.close_scope(scope, g.pop('profile_token'))
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+
+def _do_orm_execute(orm_execute_state):
+    # Les lignes lues ne sont connues qu'une fois récupérées : le résultat d'un SELECT de la
+    # session est matérialisé (comme par .all()) pour les compter, sauf en lecture par lots
+    scope = _current_scope.get()
+    options = orm_execute_state.execution_options
+    if scope is None or not orm_execute_state.is_select or options.get('yield_per') or options.get('stream_results'):
+        return None
+    frozen = orm_execute_state.invoke_statement().freeze()
+    scope.rows_read += len(frozen.data)
+    return frozen()
+
+
+def _handle_error(exception_context):
+    # Requête en échec : after_cursor_execute n'est pas appelé, retirer son heure de début
+    conn = exception_context.connection
+    if conn is not None and exception_context.execution_context is not None:
+        starts = conn.info.get('query_start')
+        if starts:
+            starts.pop()
+
+
+query_profiler = QueryProfiler()
+
+
+@contextmanager
+def profiling_scope(name: str, detail: str = None):
+    """Rattache les requêtes SQL du bloc à un contexte (exécution de scraping, tâche)"""
+    if not query_profiler.enabled:
+        yield None
+        return
+    scope, token = query_profiler.open_scope(name, detail)
+    try:
+        yield scope
+    finally:
+        query_profiler.close_scope(scope, token)
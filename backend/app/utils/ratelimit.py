@@ -0,0 +1,59 @@
+"""
+Limitation de débit de l'API par client (Flask-Limiter) : limite par défaut par route,
+budget partagé pondéré par le coût des routes coûteuses, stockage mémoire ou partagé
+(RATELIMIT_STORAGE_URL, ex. redis://)
+"""
+import logging
+from flask import current_app, jsonify, request
+from flask_limiter import Limiter
+from flask_limiter.util import get_remote_address
+from app.utils.fulltext import fulltext_available
+
+logger = logging.getLogger(__name__)
+
+limiter = Limiter(key_func=get_remote_address)
+
+# Budget commun aux routes coûteuses ; chaque appel consomme son coût
+EXPENSIVE_SCOPE = 'expensive'
+
+
+def init_limiter(app):
+    """Configure le limiteur à partir de RATELIMIT_*"""
+    # Nom historique de la configuration (Flask-Limiter lit RATELIMIT_STORAGE_URI)
+    app.config.setdefault('RATELIMIT_STORAGE_URI', app.config.get('RATELIMIT_STORAGE_URL', 'memory://'))
+    limiter.init_app(app)
+
+    @app.errorhandler(429)
+    def rate_limit_exceeded(e):
+        logger.warning(f"🚦 Rate limit exceeded for {get_remote_address()} on {request.path}: {e.description}")
+        return jsonify({'error': f'Rate limit exceeded: {e.description}'}), 429
+
+
+def expensive_limit():
+    """Budget par client des routes coûteuses (RATELIMIT_EXPENSIVE)"""
+    return current_app.config.get('RATELIMIT_EXPENSIVE', '60 per minute')
+
+
+def scrape_limit():
+    """Limite par client des scrapings déclenchés à la demande (RATELIMIT_SCRAPE)"""
+    return current_app.config.get('RATELIMIT_SCRAPE', '10 per hour')
+
+
+def search_cost() -> int:
+    """
+    Coût de POST /api/jobs/search : une recherche textuelle sans index plein texte
+    parcourt toute la table (ILIKE), bien plus coûteuse qu'un filtre indexé ; les facettes
+    ajoutent un agrégat sur tout l'ensemble filtré
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        data = {}  # Corps invalide : refusé par la vue (400)
+    facets = 2 if data.get('facets') else 0
+    if not str(data.get('query') or '').strip():
+        return 1 + facets
+    return (2 if fulltext_available() else 10) + facets
+
+
+def export_cost() -> int:
+    """Coût d'un export complet (lecture de toute la sélection)"""
+    return 10
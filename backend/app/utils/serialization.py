@@ -0,0 +1,59 @@
+"""
+Sérialisation rapide des listings : colonnes lues en tuples (sans hydratation d'objets ORM)
+et encodage JSON par orjson, avec repli sur le module json standard
+"""
+import json
+from datetime import date, datetime
+from flask import current_app
+from app.models import Job, JOB_IS_NEW
+
+try:
+    import orjson
+except ImportError:  # Accélération optionnelle
+    orjson = None
+
+# Colonnes de Job.to_dict(), dans le même ordre
+JOB_COLUMNS = (
+    Job.id, Job.search_id, Job.title, Job.company, Job.url, Job.platform, Job.location,
+    Job.description_snippet, Job.salary_info, Job.job_type, Job.date_posted, Job.date_found,
+    JOB_IS_NEW.label('is_new'),
+)
+JOB_FIELDS = tuple(column.key for column in JOB_COLUMNS)
+
+
+def job_rows(query):
+    """
+    Restreint une requête Job aux colonnes sérialisées (résultats en tuples) ; la requête doit
+    être jointe par join_new_state() (DatabaseUtils.jobs_query() l'est)
+    """
+    return query.with_entities(*JOB_COLUMNS)
+
+
+def rows_to_dicts(rows, fields=JOB_FIELDS) -> list:
+    """Convertit des tuples en dictionnaires (les dates restent natives, encodées par dumps)"""
+    return [dict(zip(fields, row)) for row in rows]
+
+
+def new_job_payload(job) -> dict:
+    """Dictionnaire d'une offre tout juste insérée (après flush), sans requête supplémentaire"""
+    payload = {field: getattr(job, field) for field in JOB_FIELDS if field != 'is_new'}
+    payload['is_new'] = True
+    return payload
+
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+def dumps(payload) -> bytes:
+    """Encode en JSON (dates au format ISO 8601)"""
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(payload, default=_default, separators=(',', ':')).encode()
+
+
+def json_response(payload, status: int = 200):
+    """Équivalent de jsonify() passant par l'encodeur rapide"""
+    return current_app.response_class(dumps(payload), status=status, mimetype='application/json')
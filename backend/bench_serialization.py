@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Benchmark de sérialisation des listings d'offres : objets ORM + to_dict() + jsonify
+contre tuples de colonnes + encodeur rapide (app/utils/serialization.py)
+
+Usage: python bench_serialization.py [--sizes 200 10000] [--repeat 5]
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+from flask import jsonify
+from sqlalchemy import insert
+from sqlalchemy.orm import undefer
+from app import create_app
+from app.models import db, Search, Job, join_new_state
+from app.utils import serialization
+from app.utils.serialization import job_rows, rows_to_dicts, json_response
+
+
+def _populate(count):
+    """Insère `count` offres dans une base en mémoire neuve"""
+    db.session.execute(insert(Job.__table__), [
+        {
+            'search_id': 1, 'title': f'Développeur Python {n}', 'company': 'JobHub',
+            'url': f'https://example.com/jobs/{n}', 'platform': 'indeed', 'location': 'Paris',
+            'description_snippet': 'Alternance développeur backend Flask / SQLAlchemy ' * 3,
+            'salary_info': '1200 €/mois', 'job_type': 'alternance',
+            'date_posted': datetime.utcnow() - timedelta(days=1),
+            'date_found': datetime.utcnow() - timedelta(minutes=n), 'is_new': True,
+        }
+        for n in range(count)
+    ])
+    db.session.commit()
+
+
+def _orm_listing(limit):
+    # is_new (propriété différée) chargé dans la même requête, sans requête par offre
+    jobs = Job.query.options(undefer(Job.is_new)).order_by(Job.date_found.desc(), Job.id.desc()).limit(limit).all()
+    return jsonify({'jobs': [job.to_dict() for job in jobs], 'total': len(jobs)}).get_data()
+
+
+def _fast_listing(limit):
+    rows = job_rows(join_new_state(Job.query)).order_by(Job.date_found.desc(), Job.id.desc()).limit(limit).all()
+    return json_response({'jobs': rows_to_dicts(rows), 'total': len(rows)}).get_data()
+
+
+def _best_of(func, limit, repeat):
+    timings = []
+    for _ in range(repeat):
+        db.session.expunge_all()
+        start = time.perf_counter()
+        func(limit)
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Job listing serialization benchmark')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[200, 10000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    app = create_app('testing')
+    with app.app_context(), app.test_request_context():
+        db.session.add(Search(keywords='bench', job_types=['alternance'], platforms=['indeed']))
+        db.session.commit()
+        _populate(max(args.sizes))
+
+        encoder = 'orjson' if serialization.orjson is not None else 'json (orjson not installed)'
+        print(f"⏱️  best of {args.repeat}, fast path encoder: {encoder}")
+        print(f"{'jobs':>8}{'to_dict+jsonify':>18}{'tuples+fast':>14}{'speedup':>10}")
+        for size in args.sizes:
+            orm_ms = _best_of(_orm_listing, size, args.repeat)
+            fast_ms = _best_of(_fast_listing, size, args.repeat)
+            print(f"{size:>8}{orm_ms:>16.1f}ms{fast_ms:>12.1f}ms{orm_ms / fast_ms:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Benchmark de concurrence SQLite : lectures/écritures par seconde avec et sans le profil
+(WAL + PRAGMA + file d'écriture unique)
+
+Usage: python bench_sqlite.py [--seconds 10] [--readers 4] [--writers 3]
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import create_engine, select, insert
+from sqlalchemy.exc import OperationalError
+from app.models import db, Search, Job
+from app.utils.engine import apply_sqlite_pragmas, WriteQueue
+from config import Config
+
+
+def _setup_engine(path, profile):
+    """Crée un moteur sur un fichier neuf, avec ou sans le profil SQLite"""
+    engine = create_engine(f'sqlite:///{path}')
+    if profile:
+        apply_sqlite_pragmas(engine, {
+            key: getattr(Config, key) for key in dir(Config) if key.startswith('SQLITE_')
+        })
+    db.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(Search.__table__).values(
+            keywords='bench', job_types='["stage"]', platforms='["indeed"]',
+            duration_minutes=15, is_active=True, created_at=datetime.utcnow()
+        ))
+    return engine
+
+
+def run_benchmark(profile, seconds, readers, writers):
+    """Lance des threads lecteurs et écrivains pendant la durée donnée"""
+    tmpdir = tempfile.mkdtemp(prefix='jobhub-bench-')
+    engine = _setup_engine(os.path.join(tmpdir, 'bench.db'), profile)
+    write_queue = WriteQueue() if profile else None
+
+    stop = threading.Event()
+    counters = {'reads': 0, 'writes': 0, 'locked': 0}
+    counters_lock = threading.Lock()
+    sequence = iter(range(10 ** 9))
+
+    def count(key):
+        with counters_lock:
+            counters[key] += 1
+
+    jobs = Job.__table__
+    recent_jobs = select(jobs.c.id, jobs.c.title).order_by(jobs.c.date_found.desc()).limit(50)
+
+    def do_write():
+        with engine.begin() as conn:
+            for _ in range(10):
+                n = next(sequence)
+                conn.execute(insert(jobs).values(
+                    search_id=1, title=f'Job {n}', company='Bench', url=f'https://example.com/{n}',
+                    platform='indeed', date_found=datetime.utcnow(), is_new=True
+                ))
+
+    def reader():
+        while not stop.is_set():
+            try:
+                with engine.connect() as conn:
+                    conn.execute(recent_jobs).fetchall()
+                count('reads')
+            except OperationalError:
+                count('locked')
+
+    def writer():
+        while not stop.is_set():
+            try:
+                if write_queue:
+                    write_queue.run(do_write)
+                else:
+                    do_write()
+                count('writes')
+            except OperationalError:
+                count('locked')
+
+    threads = [threading.Thread(target=reader) for _ in range(readers)]
+    threads += [threading.Thread(target=writer) for _ in range(writers)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    if write_queue:
+        write_queue.stop()
+    engine.dispose()
+
+    return {
+        'reads_per_s': counters['reads'] / elapsed,
+        'writes_per_s': counters['writes'] / elapsed,
+        'locked_errors': counters['locked'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='SQLite concurrency benchmark')
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--writers', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"⏱️  {args.seconds}s, {args.readers} readers, {args.writers} writers (10 inserts per write txn)")
+    print(f"{'mode':<10}{'reads/s':>12}{'writes/s':>12}{'locked':>10}")
+    for label, profile in (('baseline', False), ('profile', True)):
+        result = run_benchmark(profile, args.seconds, args.readers, args.writers)
+        print(f"{label:<10}{result['reads_per_s']:>12.1f}{result['writes_per_s']:>12.1f}"
+              f"{result['locked_errors']:>10}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Vérifie via EXPLAIN que les requêtes fréquentes utilisent un index
+(SQLite : EXPLAIN QUERY PLAN, PostgreSQL : EXPLAIN)
+
+Usage: python check_query_plans.py [config_name]   (défaut : testing, base en mémoire)
+"""
+import sys
+from datetime import datetime, timedelta
+from sqlalchemy import update
+from app import create_app
+from app.models import db, Search, Job, ExecutionLog, JobSeenOverride, JobChange
+from app.utils.database import DatabaseUtils
+
+
+def query_shapes():
+    """Requêtes à vérifier : (nom, requête, l'index doit aussi servir le tri)"""
+    since = datetime.utcnow() - timedelta(hours=24)
+    keyset_order = (Job.date_found.desc(), Job.id.desc())
+
+    return [
+        ('get_jobs_for_search',
+         DatabaseUtils.jobs_query(search_id=1).order_by(Job.date_found.desc()).limit(50),
+         True),
+        ('get_jobs_for_search (new_only)',
+         DatabaseUtils.jobs_query(search_id=1, new_only=True).order_by(Job.date_found.desc()).limit(50),
+         True),
+        ('get_recent_jobs',
+         Job.query.filter(Job.date_found >= since).order_by(Job.date_found.desc()).limit(100),
+         True),
+        ('jobs by platform',
+         DatabaseUtils.jobs_query(platform='indeed').order_by(Job.date_found.desc()).limit(50),
+         True),
+        ('GET /api/jobs page (search_id)',
+         DatabaseUtils.jobs_query(search_id=1).order_by(*keyset_order).limit(51),
+         True),
+        ('GET /api/jobs page (search_id, new_only)',
+         DatabaseUtils.jobs_query(search_id=1, new_only=True).order_by(*keyset_order).limit(51),
+         True),
+        ('new jobs of a search (count, watermark range)',
+         DatabaseUtils.jobs_query(search_id=1, new_only=True).with_entities(db.func.count(Job.id)),
+         False),
+        ('GET /api/jobs page (platform)',
+         DatabaseUtils.jobs_query(platform='indeed').order_by(*keyset_order).limit(51),
+         True),
+        ('GET /api/jobs page (all)',
+         Job.query.order_by(*keyset_order).limit(51),
+         True),
+        ('mark_jobs_as_seen (watermark)',
+         update(Search).where(Search.id == 1).values(seen_until_id=100),
+         False),
+        ('mark_jobs_as_seen (overrides)',
+         JobSeenOverride.query.filter_by(search_id=1),
+         False),
+        ('get_job_trends (90 days)',
+         db.session.query(Job.day_found, Job.platform, db.func.count(Job.id))
+           .filter(Job.day_found >= (since - timedelta(days=90)).date())
+           .group_by(Job.day_found, Job.platform)
+           .order_by(Job.day_found.desc(), Job.platform),
+         False),
+        ('reconcile hourly counters',
+         db.session.query(Job.hour_found, Job.platform, db.func.count(Job.id))
+           .filter(Job.hour_found >= since)
+           .group_by(Job.hour_found, Job.platform),
+         True),
+        ('last execution (_execute_search)',
+         ExecutionLog.query.filter_by(search_id=1).order_by(ExecutionLog.executed_at.desc()).limit(1),
+         True),
+        ('last execution of every active search (get_global_status)',
+         DatabaseUtils.last_execution_times_query(active_only=True),
+         False),
+        ('GET /api/jobs/changes',
+         JobChange.query.filter(JobChange.id > 100).order_by(JobChange.id).limit(501),
+         True),
+        ('GET /api/jobs/changes (search_id)',
+         JobChange.query.filter(JobChange.id > 100, JobChange.search_id == 1).order_by(JobChange.id).limit(501),
+         True),
+    ]
+
+
+def explain(statement):
+    """Retourne le plan d'exécution d'une requête sous forme de texte"""
+    statement = getattr(statement, 'statement', statement)
+    sql = str(statement.compile(dialect=db.engine.dialect, compile_kwargs={'literal_binds': True}))
+
+    if db.engine.dialect.name == 'sqlite':
+        rows = db.session.execute(db.text(f'EXPLAIN QUERY PLAN {sql}')).fetchall()
+        return '\n'.join(row[-1] for row in rows)
+
+    rows = db.session.execute(db.text(f'EXPLAIN {sql}')).fetchall()
+    return '\n'.join(row[0] for row in rows)
+
+
+def uses_index(plan: str) -> bool:
+    """Indique si le plan passe par un index"""
+    return 'USING INDEX' in plan or 'USING COVERING INDEX' in plan or 'PRIMARY KEY' in plan or 'Index' in plan
+
+
+def sorts_in_memory(plan: str) -> bool:
+    """Indique si le plan trie les résultats au lieu de suivre l'ordre d'un index"""
+    return 'TEMP B-TREE FOR ORDER BY' in plan or 'Sort Key' in plan
+
+
+def main():
+    config_name = sys.argv[1] if len(sys.argv) > 1 else 'testing'
+    app = create_app(config_name)
+    failures = 0
+
+    with app.app_context():
+        print(f"🔍 Checking query plans on {db.engine.dialect.name}")
+        for name, statement, ordered in query_shapes():
+            plan = explain(statement)
+            ok = uses_index(plan) and not (ordered and sorts_in_memory(plan))
+            failures += 0 if ok else 1
+            print(f"{'✅' if ok else '❌'} {name}")
+            for line in plan.splitlines():
+                print(f"      {line}")
+
+    if failures:
+        print(f"❌ {failures} query shape(s) not served by an index")
+        sys.exit(1)
+    print("✅ All query shapes use an index")
+
+
+if __name__ == '__main__':
+    main()
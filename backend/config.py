@@ -18,8 +18,85 @@ class Config:
     MAX_CONCURRENT_SCRAPERS = int(os.environ.get('MAX_CONCURRENT_SCRAPERS', 3))
     REQUEST_DELAY_SECONDS = float(os.environ.get('REQUEST_DELAY_SECONDS', 1.5))
     
-    # Rate limiting
+    # Rate limiting (par client ; stockage partagé entre workers : redis://...)
     RATELIMIT_STORAGE_URL = os.environ.get('RATELIMIT_STORAGE_URL', 'memory://')
+    RATELIMIT_ENABLED = os.environ.get('RATELIMIT_ENABLED', '1') == '1'
+    RATELIMIT_DEFAULT = os.environ.get('RATELIMIT_DEFAULT', '300 per minute')  # Par route
+    RATELIMIT_EXPENSIVE = os.environ.get('RATELIMIT_EXPENSIVE', '60 per minute')  # Budget pondéré par le coût
+    RATELIMIT_SCRAPE = os.environ.get('RATELIMIT_SCRAPE', '10 per hour')  # Scrapings à la demande
+    RATELIMIT_HEADERS_ENABLED = True
+    
+    # Profil SQLite (appliqué à chaque connexion)
+    SQLITE_PRAGMAS_ENABLED = os.environ.get('SQLITE_PRAGMAS_ENABLED', '1') == '1'
+    SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    SQLITE_CACHE_SIZE_KIB = int(os.environ.get('SQLITE_CACHE_SIZE_KIB', 20000))
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+    SQLITE_SINGLE_WRITER = os.environ.get('SQLITE_SINGLE_WRITER', '1') == '1'
+    SQLITE_FOREIGN_KEYS = os.environ.get('SQLITE_FOREIGN_KEYS', '1') == '1'
+    
+    # Recherche plein texte (FTS5 / tsvector), repli sur ILIKE si désactivée
+    FULLTEXT_SEARCH_ENABLED = os.environ.get('FULLTEXT_SEARCH_ENABLED', '1') == '1'
+    
+    # Réconciliation périodique des compteurs matérialisés (0 pour désactiver)
+    COUNTER_RECONCILE_MINUTES = int(os.environ.get('COUNTER_RECONCILE_MINUTES', 60))
+    
+    # Cache des réponses des endpoints de lecture (invalidé à chaque écriture)
+    RESPONSE_CACHE_ENABLED = os.environ.get('RESPONSE_CACHE_ENABLED', '1') == '1'
+    RESPONSE_CACHE_TTL = int(os.environ.get('RESPONSE_CACHE_TTL', 15))
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', 512))
+    RESPONSE_CACHE_REDIS_URL = os.environ.get('RESPONSE_CACHE_REDIS_URL')  # Cache partagé (optionnel)
+    # Sans Redis : délai max avant de voir les écritures des autres processus (0 = processus unique)
+    RESPONSE_CACHE_DB_SYNC_SECONDS = float(os.environ.get('RESPONSE_CACHE_DB_SYNC_SECONDS', 2))
+    
+    # Création de recherches par lot (POST /api/searches/batch)
+    SEARCH_BATCH_MAX = int(os.environ.get('SEARCH_BATCH_MAX', 500))
+    
+    # Profilage : latence par endpoint, requêtes lentes, détection des N+1
+    PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', '1') == '1'
+    SLOW_QUERY_MS = int(os.environ.get('SLOW_QUERY_MS', 200))
+    N_PLUS_ONE_THRESHOLD = int(os.environ.get('N_PLUS_ONE_THRESHOLD', 5))
+    
+    # Compression des réponses négociée par Accept-Encoding (Flask-Compress)
+    RESPONSE_COMPRESSION_ENABLED = os.environ.get('RESPONSE_COMPRESSION_ENABLED', '1') == '1'
+    COMPRESS_ALGORITHM = ['br', 'gzip']
+    COMPRESS_ALGORITHM_STREAMING = ['br', 'gzip']  # Exports NDJSON/CSV compressés au fil de l'eau
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))  # Octets, réponses non streamées
+    COMPRESS_LEVEL = int(os.environ.get('COMPRESS_LEVEL', 6))  # gzip
+    COMPRESS_BR_LEVEL = int(os.environ.get('COMPRESS_BR_LEVEL', 4))
+    # Ni text/event-stream (le compresseur retiendrait les événements SSE) ni Parquet (déjà compressé)
+    COMPRESS_MIMETYPES = ['application/json', 'application/x-ndjson', 'text/csv', 'text/plain']
+    
+    # Export en flux des offres : lignes lues par bloc
+    EXPORT_CHUNK_SIZE = int(os.environ.get('EXPORT_CHUNK_SIZE', 5000))
+    
+    # Flux SSE des nouvelles offres (/api/jobs/stream)
+    JOB_STREAM_BUFFER_SIZE = int(os.environ.get('JOB_STREAM_BUFFER_SIZE', 1000))
+    JOB_STREAM_HEARTBEAT_SECONDS = int(os.environ.get('JOB_STREAM_HEARTBEAT_SECONDS', 15))
+    JOB_STREAM_MAX_SECONDS = int(os.environ.get('JOB_STREAM_MAX_SECONDS', 300))
+    
+    # Rétention : suppression par lots des anciennes données (0 jour = conserver indéfiniment)
+    RETENTION_JOBS_DAYS = int(os.environ.get('RETENTION_JOBS_DAYS', 0))
+    RETENTION_LOGS_DAYS = int(os.environ.get('RETENTION_LOGS_DAYS', 30))
+    RETENTION_CHANGES_DAYS = int(os.environ.get('RETENTION_CHANGES_DAYS', 7))  # Journal /api/jobs/changes
+    RETENTION_BATCH_SIZE = int(os.environ.get('RETENTION_BATCH_SIZE', 500))
+    RETENTION_PAUSE_SECONDS = float(os.environ.get('RETENTION_PAUSE_SECONDS', 0.2))
+    RETENTION_INTERVAL_HOURS = int(os.environ.get('RETENTION_INTERVAL_HOURS', 24))
+    
+    # Pools de connexions (PostgreSQL / MySQL, ignorés pour SQLite)
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 5))
+    DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 30))
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+    DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', '1') == '1'
+    DB_STATEMENT_TIMEOUT_MS = int(os.environ.get('DB_STATEMENT_TIMEOUT_MS', 30000))
+    
+    # Pool séparé pour les écritures des scrapers
+    DB_SCRAPER_POOL_ENABLED = os.environ.get('DB_SCRAPER_POOL_ENABLED', '1') == '1'
+    DB_SCRAPER_POOL_SIZE = int(os.environ.get('DB_SCRAPER_POOL_SIZE', 3))
+    DB_SCRAPER_MAX_OVERFLOW = int(os.environ.get('DB_SCRAPER_MAX_OVERFLOW', 2))
+    DB_SCRAPER_STATEMENT_TIMEOUT_MS = int(os.environ.get('DB_SCRAPER_STATEMENT_TIMEOUT_MS', 120000))
 
 class DevelopmentConfig(Config):
     """Configuration pour développement"""
@@ -143,6 +143,18 @@ def show_stats():
         except Exception as e:
             print(f"❌ Error getting stats: {e}")
 
+def rollup(days=None):
+    """Recalcule le rollup quotidien JobMetrics depuis les logs d'exécution"""
+    print("📊 Rebuilding daily metrics...")
+    
+    app = create_app()
+    with app.app_context():
+        try:
+            rows = DatabaseUtils.rebuild_job_metrics(days)
+            print(f"✅ Rebuilt {rows} daily metric rows")
+        except Exception as e:
+            print(f"❌ Error rebuilding metrics: {e}")
+
 def cleanup():
     """Nettoie les anciennes données"""
     print("🧹 Cleaning up old data...")
@@ -150,21 +162,23 @@ def cleanup():
     app = create_app()
     with app.app_context():
         try:
-            # Nettoyer les anciens logs (plus de 30 jours)
-            deleted_logs = DatabaseUtils.cleanup_old_logs(days=30)
-            print(f"🗑️  Deleted {deleted_logs} old log entries")
+            # Nettoyer les anciens logs et offres, par lots (rétention configurée)
+            deleted = DatabaseUtils.apply_retention(app.config)
+            print(f"🗑️  Deleted {deleted['execution_logs']} old log entries and {deleted['jobs']} old jobs")
             
             # Marquer les anciennes offres comme vues
             from datetime import timedelta
             cutoff = datetime.utcnow() - timedelta(days=7)
-            old_jobs = Job.query.filter(
-                Job.date_found < cutoff,
-                Job.is_new == True
-            ).update({Job.is_new: False})
+            old_job_ids = [job_id for job_id, in DatabaseUtils.jobs_query(new_only=True).filter(
+                Job.date_found < cutoff
+            ).with_entities(Job.id)]
             
-            db.session.commit()
+            old_jobs = DatabaseUtils.set_jobs_new_state(old_job_ids, False)
             print(f"👁️  Marked {old_jobs} old jobs as seen")
             
+            # Resynchroniser les compteurs matérialisés
+            DatabaseUtils.reconcile_counters()
+            
         except Exception as e:
             print(f"❌ Error during cleanup: {e}")
 
@@ -177,6 +191,7 @@ def main():
         print("  reset    - Reset database (WARNING: deletes all data)")
         print("  sample   - Add sample data")
         print("  stats    - Show database statistics")
+        print("  rollup   - Rebuild daily metrics from execution logs [days]")
         print("  cleanup  - Clean up old data")
         return
     
@@ -193,6 +208,8 @@ def main():
         add_sample_data()
     elif command == 'stats':
         show_stats()
+    elif command == 'rollup':
+        rollup(int(sys.argv[2]) if len(sys.argv) > 2 else None)
     elif command == 'cleanup':
         cleanup()
     else: